@@ -1,9 +1,11 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 import pyrebase
 import json
 from pydantic import BaseModel
 import uvicorn
+import asyncio
 
 API_URL = "http://127.0.0.1:8000"
 
@@ -16,6 +18,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # Import your chains
 from src.combined_chain import CombinedLegalChatbot     
 from src.document_chain import DocumentGeneratorChain
+from src.session_manager import SessionManager
+from src.llm_client import LLM_TIMINGS, GATEWAY, warm_up
 
 app = FastAPI(title="Legal Aid Assistant API")
 
@@ -34,12 +38,16 @@ os.makedirs("generated_documents", exist_ok=True)
 app.mount("/generated_documents", StaticFiles(directory="generated_documents"), name="generated_documents")
 
 # Initialize chains
+# One base chatbot holds the shared LLM / retriever / embeddings;
+# every session gets a lightweight fork with its own memory.
 chat_chain = CombinedLegalChatbot()
+sessions = SessionManager(chat_chain)
 doc_chain = DocumentGeneratorChain()
 
 # ----------- MODELS -----------
 class ChatRequest(BaseModel):
     user_query: str
+    session_id: str = "default"
 
 class DocumentRequest(BaseModel):
     template_name: str
@@ -50,14 +58,51 @@ class DocumentRequest(BaseModel):
 # ----------- ENDPOINTS -----------
 
 @app.post("/chat")
-def chat_endpoint(request: ChatRequest):
-    response = chat_chain.generate(request.user_query)
+async def chat_endpoint(request: ChatRequest):
+    with sessions.use(request.session_id) as session:
+        async with session.lock:
+            response = await session.bot.agenerate(request.user_query)
     return {"response": response}
 
 
+def _sse(payload, event=None):
+    """Format one Server-Sent Events message."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Stream the answer as Server-Sent Events:
+    - one `data: {"token": ...}` message per generated token
+    - a final `event: done` message with the full reply and latency metrics
+    """
+    async def event_stream():
+        parts = []
+        with sessions.use(request.session_id) as session:
+            async with session.lock:
+                async for token in session.bot.astream(request.user_query):
+                    parts.append(token)
+                    yield _sse({"token": token})
+                # Read the metrics before another turn of this session can replace them
+                done = {
+                    "response": "".join(parts).strip(),
+                    "metrics": dict(session.bot.last_metrics)
+                }
+
+        yield _sse(done, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/document/generate")
-def generate_document(request: DocumentRequest):
-    pdf_path, text = doc_chain.generate(
+async def generate_document(request: DocumentRequest):
+    pdf_path, text = await doc_chain.agenerate(
         template_name=request.template_name,
         field_values=request.user_inputs,
         user_query=request.user_query
@@ -121,9 +166,58 @@ def list_templates():
 #     }
 
 
+@app.get("/cache/stats")
+def cache_stats():
+    cache = chat_chain.answer_cache
+    return {
+        "semantic_cache": cache.stats() if cache else None,
+        "query_embeddings": chat_chain.embeddings.cache_stats(),
+        "single_flight": chat_chain.single_flight.stats if chat_chain.single_flight else None,
+        "retrieval_cache": chat_chain.retriever.cache.stats() if hasattr(chat_chain.retriever, "cache") else None,
+        "faq": {"version": chat_chain.faq.version, **chat_chain.faq.stats} if chat_chain.faq else None,
+    }
+
+
+@app.post("/faq/reload")
+def reload_faq():
+    """Serve the latest `python -m src.faq_index build` output without a restart."""
+    if not chat_chain.faq:
+        raise HTTPException(status_code=404, detail="FAQ index disabled")
+    chat_chain.faq.reload()
+    return {"version": chat_chain.faq.version, "entries": len(chat_chain.faq)}
+
+
+@app.get("/llm/stats")
+def llm_stats():
+    """Ollama timings per model, gateway queueing and per-tier latency."""
+    return {
+        "timings": LLM_TIMINGS.stats(),
+        "gateway": GATEWAY.stats(),
+        "tiers": chat_chain.cascade.stats(),
+    }
+
+
+@app.on_event("startup")
+async def warm_models():
+    # Load the models before the first user request (OLLAMA_WARMUP=0 to skip)
+    if os.getenv("OLLAMA_WARMUP", "1") == "0":
+        return
+    await asyncio.to_thread(chat_chain.warm_up)
+    if doc_chain.llm.model not in {llm.model for llm in chat_chain.cascade.tiers.values()}:
+        await asyncio.to_thread(warm_up, doc_chain.llm.model)
+
+
+@app.on_event("shutdown")
+def save_caches():
+    if chat_chain.answer_cache:
+        chat_chain.answer_cache.save()
+    if hasattr(chat_chain.retriever, "cache"):
+        chat_chain.retriever.cache.flush()
+
+
 @app.get("/session/reset")
-def reset_memory():
-    chat_chain.memory.reset()
+def reset_memory(session_id: str = "default"):
+    sessions.drop(session_id)
     return {"status": "Memory cleared"}
 
 
@@ -5,6 +5,16 @@ import { useNavigate } from 'react-router-dom';
 
 const API_URL = 'http://127.0.0.1:8000';
 
+// Each browser tab gets its own backend chat session (separate memory)
+const getSessionId = () => {
+    let sessionId = sessionStorage.getItem('chatSessionId');
+    if (!sessionId) {
+        sessionId = crypto.randomUUID();
+        sessionStorage.setItem('chatSessionId', sessionId);
+    }
+    return sessionId;
+};
+
 const ChatPage = () => {
     const navigate = useNavigate();
     const [messages, setMessages] = useState([
@@ -62,7 +72,7 @@ const ChatPage = () => {
             const response = await fetch(`${API_URL}/chat`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ user_query: userMessage.content }),
+                body: JSON.stringify({ user_query: userMessage.content, session_id: getSessionId() }),
             });
 
             if (response.ok) {
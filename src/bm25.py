@@ -0,0 +1,216 @@
+# src/bm25.py
+"""
+Local BM25 (lexical) index over the ingested chunk store.
+
+Dense MiniLM search is weak on exact legal references ("Section 154 CrPC",
+"RTI Act 2005", "Order VII Rule 1"); BM25 keeps numbers and roman numerals as
+tokens so these match exactly. Used by HybridRetriever (src/retriever.py).
+
+Postings are stored compactly in CSR form:
+- term_offsets[t] : start of term t's postings (int64, len = vocab + 1)
+- post_docs       : doc rows, grouped per term (int32)
+- post_tfs        : term frequencies (uint16)
+Index directory (BM25_INDEX_DIR): docs.jsonl + postings.npz + vocab.json
+"""
+
+import os
+import re
+import json
+import threading
+from collections import Counter
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.local_store import matches_filter
+
+
+DEFAULT_BM25_DIR = os.getenv("BM25_INDEX_DIR", "bm25_index")
+
+TOKEN_RE = re.compile(r"[a-z]+|\d+[a-z]*")
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "to", "for", "and", "or", "is", "are",
+    "be", "by", "with", "as", "at", "it", "this", "that", "from", "was", "what",
+    "how", "do", "does", "can", "i", "my", "me", "shall", "any",
+}
+
+
+def tokenize(text: str):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+
+    def __init__(self, index_dir: str = DEFAULT_BM25_DIR, k1: float = 1.5, b: float = 0.75):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+
+        self._docs = {}          # id → {"text", "metadata"}
+        self._ids = []           # row → id (frozen by _build)
+        self._vocab = {}         # term → term id
+        self._term_offsets = np.zeros(1, dtype=np.int64)
+        self._post_docs = np.zeros(0, dtype=np.int32)
+        self._post_tfs = np.zeros(0, dtype=np.uint16)
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._norm = np.zeros(0, dtype=np.float32)   # k1 * (1 - b + b * dl / avgdl)
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._dirty = False
+        self._lock = threading.RLock()
+
+        if os.path.exists(os.path.join(index_dir, "docs.jsonl")):
+            self.load()
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------------------------------------------------------
+    # Mutation (postings are rebuilt lazily)
+    # ---------------------------------------------------------
+    def add(self, ids, texts, metadatas=None):
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            for cid, text, meta in zip(ids, texts, metadatas):
+                self._docs[cid] = {"text": text, "metadata": meta}
+            self._dirty = True
+
+    def delete(self, ids):
+        with self._lock:
+            for cid in ids:
+                self._docs.pop(cid, None)
+            self._dirty = True
+
+    # ---------------------------------------------------------
+    # Build / persist
+    # ---------------------------------------------------------
+    def _build(self):
+        ids = list(self._docs)
+        vocab = {}
+        per_term = []            # term id → list of (row, tf)
+        doc_len = np.zeros(len(ids), dtype=np.float32)
+
+        for row, cid in enumerate(ids):
+            counts = Counter(tokenize(self._docs[cid]["text"]))
+            doc_len[row] = sum(counts.values())
+            for term, tf in counts.items():
+                tid = vocab.setdefault(term, len(vocab))
+                if tid == len(per_term):
+                    per_term.append([])
+                per_term[tid].append((row, min(tf, 65535)))
+
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in per_term])
+        post_docs = np.fromiter((r for p in per_term for r, _ in p), dtype=np.int32, count=offsets[-1])
+        post_tfs = np.fromiter((tf for p in per_term for _, tf in p), dtype=np.uint16, count=offsets[-1])
+
+        self._install(ids, vocab, offsets, post_docs, post_tfs, doc_len)
+
+    def _install(self, ids, vocab, offsets, post_docs, post_tfs, doc_len):
+        n = len(ids)
+        df = np.diff(offsets).astype(np.float32)
+        avgdl = float(doc_len.mean()) if n else 1.0
+
+        self._ids = ids
+        self._vocab = vocab
+        self._term_offsets = offsets
+        self._post_docs = post_docs
+        self._post_tfs = post_tfs
+        self._idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self._norm = (self.k1 * (1 - self.b + self.b * doc_len / (avgdl or 1.0))).astype(np.float32)
+        self._doc_len = doc_len
+        self._dirty = False
+
+    def save(self):
+        with self._lock:
+            if self._dirty:
+                self._build()
+            os.makedirs(self.index_dir, exist_ok=True)
+
+            path = os.path.join(self.index_dir, "docs.jsonl")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                for cid in self._ids:
+                    f.write(json.dumps({"id": cid, **self._docs[cid]}, ensure_ascii=False) + "\n")
+            os.replace(path + ".tmp", path)
+
+            path = os.path.join(self.index_dir, "postings.npz")
+            with open(path + ".tmp", "wb") as f:
+                np.savez(
+                    f,
+                    term_offsets=self._term_offsets,
+                    post_docs=self._post_docs,
+                    post_tfs=self._post_tfs,
+                    doc_len=self._doc_len,
+                )
+            os.replace(path + ".tmp", path)
+
+            path = os.path.join(self.index_dir, "vocab.json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._vocab, f)
+            os.replace(path + ".tmp", path)
+
+    def load(self):
+        docs = {}
+        with open(os.path.join(self.index_dir, "docs.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                d = json.loads(line)
+                docs[d["id"]] = {"text": d["text"], "metadata": d.get("metadata", {})}
+
+        with self._lock:
+            self._docs = docs
+            postings = os.path.join(self.index_dir, "postings.npz")
+            if os.path.exists(postings):
+                data = np.load(postings)
+                with open(os.path.join(self.index_dir, "vocab.json"), "r", encoding="utf-8") as f:
+                    vocab = json.load(f)
+                self._install(
+                    list(docs), vocab, data["term_offsets"],
+                    data["post_docs"], data["post_tfs"], data["doc_len"]
+                )
+            else:
+                self._build()
+
+        print(f"📚 BM25 index loaded: {len(docs)} chunks from {self.index_dir}")
+
+    # ---------------------------------------------------------
+    # Search
+    # ---------------------------------------------------------
+    def search(self, query: str, k: int = 10, filter=None):
+        """Return [(Document, bm25_score)] for the top-k chunks."""
+        with self._lock:
+            if self._dirty:
+                self._build()
+            n = len(self._ids)
+            if not n:
+                return []
+
+            scores = np.zeros(n, dtype=np.float32)
+            for term in set(tokenize(query)):
+                tid = self._vocab.get(term)
+                if tid is None:
+                    continue
+                start, end = self._term_offsets[tid], self._term_offsets[tid + 1]
+                rows = self._post_docs[start:end]
+                tf = self._post_tfs[start:end].astype(np.float32)
+                scores[rows] += self._idf[tid] * tf * (self.k1 + 1) / (tf + self._norm[rows])
+
+            candidates = np.flatnonzero(scores > 0)
+            if filter:
+                candidates = [
+                    r for r in candidates
+                    if matches_filter(self._docs[self._ids[r]]["metadata"], filter)
+                ]
+                candidates = np.asarray(candidates, dtype=np.int64)
+            if not len(candidates):
+                return []
+
+            top = candidates[np.argsort(-scores[candidates])[:k]]
+            return [(self._to_document(int(r), float(scores[r])), float(scores[r])) for r in top]
+
+    def _to_document(self, row, score):
+        cid = self._ids[row]
+        doc = self._docs[cid]
+        return Document(
+            page_content=doc["text"],
+            metadata={**doc["metadata"], "bm25_score": score},
+            id=cid
+        )
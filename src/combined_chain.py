@@ -1,24 +1,55 @@
 # src/combined_chain.py
 
+import os
 import re
-from langchain_ollama import ChatOllama
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, aclosing
 from langchain_core.prompts import ChatPromptTemplate
 
+from src.embeddings import load_embedding_model, normalize_query
 from src.retriever import build_retriever
-from src.memory_chain import MemoryChatbot
+from src.memory_chain import MemoryChatbot, FactGate
+from src.fact_worker import FactExtractionWorker
+from src.semantic_cache import SemanticCache
+from src.faq_index import FAQIndex
+from src.intent_router import IntentRouter, DEFAULT_ROUTER
+from src.prompt_budget import PromptAssembler
+from src.context_compressor import ContextCompressor
+from src.single_flight import SingleFlight
+from src.personal_responder import PersonalFactResponder
+from src.history_store import estimate_tokens
+from src.llm_client import get_chat_model, ollama_timings, warm_up, PRIORITY_CHAT
+from src.model_cascade import ModelCascade, LARGE_MODEL, SMALL_MODEL
 
 
 
 
+# Max seconds a personal question waits for background fact extraction
+FACT_WAIT_TIMEOUT = float(os.getenv("FACT_WAIT_TIMEOUT", "10"))
+
+# Threads for the memory branch of a turn, shared by all sessions
+TURN_STAGE_WORKERS = int(os.getenv("TURN_STAGE_WORKERS", "8"))
+_stage_pool = None
+_stage_pool_lock = threading.Lock()
+
+
+def _get_stage_pool():
+    global _stage_pool
+    with _stage_pool_lock:
+        if _stage_pool is None:
+            _stage_pool = ThreadPoolExecutor(max_workers=TURN_STAGE_WORKERS, thread_name_prefix="turn-stage")
+        return _stage_pool
+
+
 # ---------------------------------------------------------
 # Load LLM
 # ---------------------------------------------------------
-def load_llm(model_name="llama2"):
-    return ChatOllama(
-        model=model_name,
-        temperature=0.2,
-        max_tokens=200
-    )
+def load_llm(model_name=LARGE_MODEL, priority=PRIORITY_CHAT):
+    # num_predict caps the reply (ChatOllama ignores max_tokens)
+    return get_chat_model(model_name, temperature=0.2, num_predict=200, priority=priority)
 
 
 # ---------------------------------------------------------
@@ -40,57 +71,134 @@ Rules:
 
 # ---------------------------------------------------------
 # PROMPT TEMPLATE
+# Ordered from most to least stable so Ollama can reuse the KV cache of
+# the previous request's prefix: rules, facts, history, context, query.
 # ---------------------------------------------------------
 prompt_template = ChatPromptTemplate.from_messages([
     ("system", SYSTEM_PROMPT),
     ("system", "Known user facts:\n{memory}"),
-    ("system", "Legal context:\n{context}"),
     ("system", "Conversation:\n{history}"),
+    ("system", "Legal context:\n{context}"),
     ("user", "{query}")
 ])
 
+# Tokens of the fixed part of the prompt (system rules + section headers)
+STATIC_PROMPT_TOKENS = estimate_tokens(
+    SYSTEM_PROMPT + "Known user facts:\n" + "Legal context:\n" + "Conversation:\n"
+)
+
 
 # ---------------------------------------------------------
-# Intent Classification
+# Intent Classification (see src/intent_router.py)
 # ---------------------------------------------------------
-PERSONAL_PATTERNS = [
-    r"my name",
-    r"who am i",
-    r"where do i live",
-    r"i live",
-    r"i am a",
-    r"what do i do",
-    r"what is my",
-]
-
-LEGAL_PATTERNS = [
-    r"dispute",
-    r"rights",
-    r"law",
-    r"illegal",
-    r"how to file",
-    r"fir",
-    r"rti",
-    r"tenant",
-    r"harassment",
-    r"police",
-]
+def is_legal_query(q):
+    return DEFAULT_ROUTER.route(q).is_legal
 
 
-def is_legal_query(q):
-    q = q.lower()
-    return any(re.search(p, q) for p in LEGAL_PATTERNS)
+def is_personal_query(q):
+    return DEFAULT_ROUTER.route(q).is_personal
 
 
 # ---------------------------------------------------------
 # Combined Chatbot
 # ---------------------------------------------------------
 class CombinedLegalChatbot:
-    def __init__(self, model_name="llama2"):
-        self.llm = load_llm(model_name)
-        self.retriever = build_retriever(5)
-        self.memory = MemoryChatbot()
+    def __init__(
+        self,
+        model_name=None,
+        llm=None,
+        retriever=None,
+        memory=None,
+        embeddings=None,
+        answer_cache=None,
+        router=None,
+        assembler=None,
+        single_flight=None,
+        responder=None,
+        cascade=None,
+        faq=None,
+        compressor=None,
+    ):
+        # Heavy objects (LLM client, retriever + embeddings, answer cache) can
+        # be passed in so that many sessions share them; see fork().
+        # self.llm is the large tier; see src/model_cascade.py
+        self.llm = llm or load_llm(model_name or LARGE_MODEL)
+        self.embeddings = embeddings or load_embedding_model()
+        self.retriever = retriever or build_retriever(5, embeddings=self.embeddings)
+        if memory is None:
+            # LLM fact extraction runs off the chat path unless FACT_EXTRACTION=inline
+            worker = None
+            if os.getenv("FACT_EXTRACTION", "background") != "inline":
+                worker = FactExtractionWorker()
+            memory = MemoryChatbot(fact_worker=worker, fact_gate=FactGate(self.embeddings))
+        self.memory = memory
+        self.router = router or IntentRouter(embeddings=self.embeddings)
+        self.assembler = assembler or PromptAssembler(static_tokens=STATIC_PROMPT_TOKENS)
+        # Keep only the retrieved sentences closest to the query
+        if compressor is None and os.getenv("CONTEXT_COMPRESSION", "1") != "0":
+            compressor = ContextCompressor(self.embeddings)
+        self.compressor = compressor
+
+        # Vetted answers for frequent questions (built by `python -m src.faq_index build`)
+        if faq is None and os.getenv("FAQ_INDEX", "1") != "0":
+            faq = FAQIndex(self.embeddings)
+        self.faq = faq
+
+        if answer_cache is None and os.getenv("SEMANTIC_CACHE", "1") != "0":
+            answer_cache = SemanticCache(self.embeddings)
+        self.answer_cache = answer_cache
+
+        # Identical concurrent retrieval / non-personal LLM calls run once
+        if single_flight is None and os.getenv("SINGLE_FLIGHT", "1") != "0":
+            single_flight = SingleFlight()
+        self.single_flight = single_flight
+        # "What is my name?"-style lookups are answered straight from memory
+        self.responder = responder or PersonalFactResponder()
+
+        if cascade is None:
+            small = self.llm
+            if SMALL_MODEL and SMALL_MODEL != getattr(self.llm, "model", None):
+                small = load_llm(SMALL_MODEL, priority=getattr(self.llm, "priority", PRIORITY_CHAT))
+            cascade = ModelCascade({"small": small, "large": self.llm})
+        self.cascade = cascade
+
+        # Latency of the last turn: time-to-first-token and total seconds
+        self.last_metrics = {}
+        self.last_route = None
+        self._reset_turn()
+        self._tier = ("large", "default")
 
+    # -----------------------------------------------------
+    def fork(self):
+        """
+        New chatbot with its own (empty) memory that shares this one's LLM,
+        retriever, embeddings, answer cache, intent router and fact extraction
+        (LLM + background worker). Cheap enough to create per session.
+        """
+        return CombinedLegalChatbot(
+            llm=self.llm,
+            retriever=self.retriever,
+            memory=MemoryChatbot(
+                llm=self.memory.llm,
+                fact_worker=self.memory.fact_worker,
+                fact_gate=self.memory.fact_gate
+            ),
+            embeddings=self.embeddings,
+            answer_cache=self.answer_cache,
+            router=self.router,
+            assembler=self.assembler,
+            single_flight=self.single_flight,
+            responder=self.responder,
+            cascade=self.cascade,
+            faq=self.faq,
+            compressor=self.compressor
+        )
+
+    # -----------------------------------------------------
+    def warm_up(self):
+        """Load the chat model(s) and prefill the static system prompt."""
+        models = {llm.model for llm in self.cascade.tiers.values()}
+        return {model: warm_up(model, SYSTEM_PROMPT) for model in models}
 
     # -----------------------------------------------------
     def _get_memory_string(self):
@@ -100,54 +208,403 @@ class CombinedLegalChatbot:
 
     # -----------------------------------------------------
     def _summarize_history(self):
-        msgs = self.memory.history.messages[-6:]
-        out = []
-        for m in msgs:
-            if m.type == "human":
-                out.append("User: " + m.content)
-            else:
-                out.append("Assistant: " + m.content)
-        return "\n".join(out)
+        # Preformatted recent turns + rolling summary (see src/history_store.py)
+        return self.memory.history.render()
 
     # -----------------------------------------------------
-    def _retrieve_context(self, user_query):
-        """Use RAG ONLY for legal queries."""
-        if not is_legal_query(user_query):
-            return "None"
+    def _retrieve_context(self, user_query, route):
+        """Use RAG ONLY for legal queries. Returns scored Documents."""
+        if not route.is_legal:
+            return []
+
+        # Domain partitions for PartitionedRetriever; other retrievers ignore them
+        kwargs = {"domains": route.domains} if route.domains else {}
+        if self.single_flight is None:
+            return self.retriever.invoke(user_query, **kwargs)
+        return self.single_flight.do(
+            self._retrieval_key(user_query),
+            lambda: self.retriever.invoke(user_query, **kwargs)
+        )
+
+    async def _aretrieve_context(self, user_query, route):
+        """Async variant of _retrieve_context using the async retriever."""
+        if not route.is_legal:
+            return []
+
+        kwargs = {"domains": route.domains} if route.domains else {}
+        if self.single_flight is None:
+            return await self.retriever.ainvoke(user_query, **kwargs)
+        return await self.single_flight.ado(
+            self._retrieval_key(user_query),
+            lambda: self.retriever.ainvoke(user_query, **kwargs)
+        )
+
+    def _retrieval_key(self, user_query):
+        return ("retrieve", id(self.retriever), normalize_query(user_query))
 
-        docs = self.retriever.invoke(user_query)
-        if docs:
-            return "\n---\n".join([d.page_content for d in docs])
-        return "None"
+    # -----------------------------------------------------
+    # LLM calls (identical non-personal prompts are coalesced)
+    # -----------------------------------------------------
+    @property
+    def _turn_llm(self):
+        """LLM of the tier chosen for the current turn."""
+        return self.cascade.llm(self._tier[0])
+
+    def _llm_key(self, llm, prompt):
+        """Coalescing key, or None when the prompt carries personal facts."""
+        if self.single_flight is None or self.memory.memory_store:
+            return None
+        return (
+            "llm",
+            getattr(llm, "model", None),
+            repr(getattr(llm, "options", None)),
+            re.sub(r"\s+", " ", prompt.to_string()).strip()
+        )
+
+    def _invoke_llm(self, prompt):
+        llm = self._turn_llm
+        key = self._llm_key(llm, prompt)
+        if key is None:
+            return llm.invoke(prompt)
+        return self.single_flight.do(key, lambda: llm.invoke(prompt))
+
+    async def _ainvoke_llm(self, prompt):
+        llm = self._turn_llm
+        key = self._llm_key(llm, prompt)
+        if key is None:
+            return await llm.ainvoke(prompt)
+        return await self.single_flight.ado(key, lambda: llm.ainvoke(prompt))
 
 
 
     # -----------------------------------------------------
-    # MAIN GENERATE FUNCTION
+    # FAQ index + semantic answer cache (non-personal legal questions only)
     # -----------------------------------------------------
-    def generate(self, user_query):
+    def _is_faq_candidate(self, route):
+        return self.faq is not None and route.is_legal and not route.is_personal
+
+    def _is_cacheable(self, route):
+        # A follow-up is answered in the light of this session's history,
+        # so it is neither served from nor stored in the shared cache
+        return (
+            self.answer_cache is not None
+            and route.is_legal
+            and not route.is_personal
+            and not self._follow_up
+        )
 
-        # 1️⃣ Update memory
-        self.memory.add_user_message(user_query)
+    # -----------------------------------------------------
+    # Direct answers for single personal-fact questions
+    # -----------------------------------------------------
+    def _personal_lookup(self, route, user_query):
+        """Fact key for a plain lookup question ("who am I?"), else None."""
+        if route.is_legal:
+            return None
+        return self.responder.match(user_query)
+
+    def _answer_from_memory(self, key):
+        answer = self.responder.answer(key, self.memory)
+        if answer is not None:
+            self._answer_source = "memory"
+        return answer
 
-        # 2️⃣ RAG context if legal
-        context = self._retrieve_context(user_query)
+    # -----------------------------------------------------
+    # Turn preparation / completion shared by all entry points
+    # -----------------------------------------------------
+    def _reset_turn(self):
+        # Called before the user message is added: any history is earlier turns
+        self._follow_up = bool(self._summarize_history())
+        self._prompt_report = {}
+        self._prompt_has_facts = False
+        self._retrieval_report = {}
+        self._compression_report = {}
+        self._llm_timings = {}
+        self._answer_source = "llm"
+        self._stage_times = {}
+
+    def _timed(self, stage, fn, *args):
+        t = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._stage_times[stage] = time.perf_counter() - t
+
+    async def _atimed(self, stage, awaitable):
+        t = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._stage_times[stage] = time.perf_counter() - t
+
+    def _lookup_answer(self, route, user_query):
+        """Vetted FAQ answer, then the semantic cache (legal questions only)."""
+        if self._is_faq_candidate(route):
+            match = self.faq.lookup(user_query)
+            if match is not None:
+                self._answer_source = "faq"
+                return match["answer"]
+
+        if self._is_cacheable(route):
+            cached = self.answer_cache.lookup(user_query)
+            if cached is not None:
+                self._answer_source = "cache"
+                return cached
+        return None
+
+    async def _alookup_answer(self, route, user_query):
+        if self._is_faq_candidate(route):
+            match = await self.faq.alookup(user_query)
+            if match is not None:
+                self._answer_source = "faq"
+                return match["answer"]
+
+        if self._is_cacheable(route):
+            cached = await self.answer_cache.alookup(user_query)
+            if cached is not None:
+                self._answer_source = "cache"
+                return cached
+        return None
+
+    def _prepare_turn(self, user_query):
+        """
+        Update memory and either answer directly (memory lookup, FAQ,
+        semantic cache) or build the LLM prompt.
+        Returns (prompt, answer): exactly one of them is not None.
+
+        Stages form two branches that run concurrently:
+          memory:  history + fact extraction
+          answer:  route → FAQ / cache lookup → retrieval
+        and join before the prompt is built, so the time before the LLM
+        starts is the slower branch, not the sum. Per-stage seconds go to
+        last_metrics["stages"].
+        """
+        self._reset_turn()
+        start = time.perf_counter()
+
+        # 1️⃣ Update memory (on the stage pool, next to the answer branch)
+        memory_job = _get_stage_pool().submit(self._timed, "memory", self.memory.add_user_message, user_query)
+        try:
+            # 2️⃣ Route once: legal / personal / greeting / document
+            route = self.last_route = self._timed("route", self.router.route, user_query)
+
+            # 3️⃣ Personal lookups straight from memory (needs the memory branch)
+            key = self._personal_lookup(route, user_query)
+            if key is not None:
+                memory_job.result()
+                if not self.memory.get_fact(key):
+                    self._timed("wait_facts", self.memory.wait_for_pending_facts, FACT_WAIT_TIMEOUT)
+                answer = self._answer_from_memory(key)
+                if answer is not None:
+                    return None, answer
+
+            # 4️⃣ Vetted FAQ answers, then the semantic cache for repeated legal questions
+            answer = self._timed("lookup", self._lookup_answer, route, user_query)
+            if answer is not None:
+                return None, answer
+
+            # 5️⃣ RAG context if legal
+            docs = self._timed("retrieve", self._retrieve_context, user_query, route)
+            self._retrieval_report = {"retrieved_chunks": len(docs)}
+            docs = self._timed("compress", self._compress_context, user_query, docs)
+        finally:
+            # Join: the prompt (and any direct answer) follows the user turn in history
+            memory_job.result()
+
+        # Personal questions need facts still being extracted in the background
+        if route.is_personal:
+            self._timed("wait_facts", self.memory.wait_for_pending_facts, FACT_WAIT_TIMEOUT)
+
+        # 6️⃣ Pick the model tier and build the prompt within the token budget
+        self._tier = self.cascade.choose(route, docs, user_query)
+        prompt = self._timed("prompt", self._build_prompt, user_query, docs)
+        self._stage_times["pre_llm"] = time.perf_counter() - start
+        return prompt, None
+
+    async def _aprepare_turn(self, user_query):
+        """Async variant of _prepare_turn (the memory branch is a task)."""
+        self._reset_turn()
+        start = time.perf_counter()
+
+        memory_task = asyncio.ensure_future(
+            self._atimed("memory", self.memory.aadd_user_message(user_query))
+        )
+        try:
+            route = self.last_route = await self._atimed("route", self.router.aroute(user_query))
+
+            key = self._personal_lookup(route, user_query)
+            if key is not None:
+                await memory_task
+                if not self.memory.get_fact(key):
+                    await self._atimed("wait_facts", self.memory.await_pending_facts(timeout=FACT_WAIT_TIMEOUT))
+                answer = self._answer_from_memory(key)
+                if answer is not None:
+                    return None, answer
+
+            answer = await self._atimed("lookup", self._alookup_answer(route, user_query))
+            if answer is not None:
+                return None, answer
+
+            docs = await self._atimed("retrieve", self._aretrieve_context(user_query, route))
+            self._retrieval_report = {"retrieved_chunks": len(docs)}
+            docs = await self._atimed("compress", asyncio.to_thread(self._compress_context, user_query, docs))
+        finally:
+            await memory_task
+
+        if route.is_personal:
+            await self._atimed("wait_facts", self.memory.await_pending_facts(timeout=FACT_WAIT_TIMEOUT))
+        self._tier = self.cascade.choose(route, docs, user_query)
+        prompt = self._timed("prompt", self._build_prompt, user_query, docs)
+        self._stage_times["pre_llm"] = time.perf_counter() - start
+        return prompt, None
+
+    def _compress_context(self, user_query, docs):
+        if self.compressor is None or not docs:
+            return docs
+        docs, self._compression_report = self.compressor.compress(user_query, docs)
+        return docs
+
+    def _build_prompt(self, user_query, docs):
+        # An answer written with the user's facts in view may be tailored to
+        # them even without quoting one: it never enters the shared cache
+        self._prompt_has_facts = bool(self.memory.memory_store)
+        sections, self._prompt_report = self.assembler.assemble(
+            user_query,
+            self._get_memory_string(),
+            docs,
+            self._summarize_history()
+        )
+        return prompt_template.invoke(sections)
+
+    def _should_cache(self, response, source):
+        return (
+            source == "llm" and response
+            and self._is_cacheable(self.last_route)
+            and not self._prompt_has_facts
+        )
+
+    def _finish_turn(self, user_query, response, start, ttft=None, source="llm"):
+        if self._should_cache(response, source):
+            self.answer_cache.put(user_query, response)
+        return self._record_turn(response, start, ttft, source)
+
+    async def _afinish_turn(self, user_query, response, start, ttft=None, source="llm"):
+        """Async variant of _finish_turn (the cache embeds and saves off the loop)."""
+        if self._should_cache(response, source):
+            await self.answer_cache.aput(user_query, response)
+        return self._record_turn(response, start, ttft, source)
+
+    def _record_turn(self, response, start, ttft, source):
+        # Save assistant reply in memory
+        self.memory.add_assistant_response(response)
+
+        total = time.perf_counter() - start
+        if source == "llm":
+            self.cascade.record(self._tier[0], total)
+        # Without streaming the first token reaches the user with the last one
+        self.last_metrics = {
+            "ttft": total if ttft is None else ttft,
+            "total": total,
+            "source": source,
+            "prompt_tokens": 0,
+            **self._prompt_report,
+            **self._retrieval_report,
+            **self._compression_report,
+            **self._llm_timings,
+            "stages": dict(self._stage_times),
+        }
+        if source == "llm":
+            self.last_metrics["tier"], self.last_metrics["tier_reason"] = self._tier
+            self.last_metrics["model"] = getattr(self._turn_llm, "model", None)
+        return response
+
+    # -----------------------------------------------------
+    # MAIN GENERATE FUNCTION
+    # -----------------------------------------------------
+    def generate(self, user_query):
+        start = time.perf_counter()
+        prompt, answer = self._prepare_turn(user_query)
+        if answer is not None:
+            return self._finish_turn(user_query, answer, start, source=self._answer_source)
 
-        # 3️⃣ Build final prompt
-        prompt = prompt_template.invoke({
-            "memory": self._get_memory_string(),
-            "context": context,
-            "history": self._summarize_history(),
-            "query": user_query
-        })
+        # 7️⃣ Generate answer
+        message = self._invoke_llm(prompt)
+        self._llm_timings = ollama_timings(message.response_metadata)
+        response = message.content.strip()
 
-        # 4️⃣ Generate answer
-        response = self.llm.invoke(prompt).content.strip()
+        # 8️⃣ Save assistant reply in memory
+        return self._finish_turn(user_query, response, start)
 
-        # 5️⃣ Save assistant reply in memory
-        self.memory.add_assistant_response(response)
+    # -----------------------------------------------------
+    # STREAMING GENERATE FUNCTION
+    # -----------------------------------------------------
+    def stream(self, user_query):
+        """
+        Same pipeline as generate(), but yields answer tokens as soon as
+        ChatOllama produces them. The full reply is written to memory once
+        the stream ends (or the consumer stops early).
+        """
+        start = time.perf_counter()
+        prompt, answer = self._prepare_turn(user_query)
+        if answer is not None:
+            self._finish_turn(user_query, answer, start, source=self._answer_source)
+            yield answer
+            return
+
+        parts = []
+        ttft = None
+        try:
+            # closing(): release the LLM gateway slot as soon as the consumer stops
+            with closing(self._turn_llm.stream(prompt)) as chunks:
+                for chunk in chunks:
+                    if chunk.response_metadata.get("done"):
+                        self._llm_timings = ollama_timings(chunk.response_metadata)
+                    if not chunk.content:
+                        continue
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    parts.append(chunk.content)
+                    yield chunk.content
+        finally:
+            self._finish_turn(user_query, "".join(parts).strip(), start, ttft)
 
-        return response
+    # -----------------------------------------------------
+    # ASYNC VARIANTS (used by the FastAPI server)
+    # -----------------------------------------------------
+    async def agenerate(self, user_query):
+        """Async generate(): no thread is held while Ollama/Pinecone work."""
+        start = time.perf_counter()
+        prompt, answer = await self._aprepare_turn(user_query)
+        if answer is not None:
+            return await self._afinish_turn(user_query, answer, start, source=self._answer_source)
+
+        message = await self._ainvoke_llm(prompt)
+        self._llm_timings = ollama_timings(message.response_metadata)
+        return await self._afinish_turn(user_query, message.content.strip(), start)
+
+    async def astream(self, user_query):
+        """Async stream(): yields answer tokens from ChatOllama.astream."""
+        start = time.perf_counter()
+        prompt, answer = await self._aprepare_turn(user_query)
+        if answer is not None:
+            await self._afinish_turn(user_query, answer, start, source=self._answer_source)
+            yield answer
+            return
+
+        parts = []
+        ttft = None
+        try:
+            async with aclosing(self._turn_llm.astream(prompt)) as chunks:
+                async for chunk in chunks:
+                    if chunk.response_metadata.get("done"):
+                        self._llm_timings = ollama_timings(chunk.response_metadata)
+                    if not chunk.content:
+                        continue
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    parts.append(chunk.content)
+                    yield chunk.content
+        finally:
+            await self._afinish_turn(user_query, "".join(parts).strip(), start, ttft)
 
 # src/combined_chain.py
 # src/combined_chain.py
@@ -0,0 +1,117 @@
+# src/context_compressor.py
+"""
+Extractive compression of retrieved context.
+
+Statute chunks are long and only a few of their sentences usually answer
+the question. Between retrieval and prompt assembly the chunks are split
+into sentences, every sentence is embedded in ONE batched MiniLM call and
+scored against the query vector with a single matrix product, and only the
+best sentences are kept until CONTEXT_COMPRESSION_BUDGET tokens are used.
+
+Kept sentences stay in their original order inside their chunk, chunks
+keep the retriever's order and scores, and chunks with no kept sentence
+are dropped. Context already within the budget is passed through untouched
+(no encode at all); otherwise every retrieved sentence is encoded on each
+turn, so CONTEXT_COMPRESSION=0 turns it off where that costs more than the
+prompt tokens it saves.
+"""
+
+import os
+import re
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.history_store import estimate_tokens
+
+
+DEFAULT_BUDGET = int(os.getenv("CONTEXT_COMPRESSION_BUDGET", "500"))
+MIN_SENTENCE_CHARS = 25
+
+# Sentence ends: . ; ? ! followed by a capital, digit or bracket, or a newline
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.;?!])\s+(?=[A-Z0-9(\"'])|\n+")
+# "Sec. 154", "No. 3", "i.e. the" ... must not end a sentence
+ABBREVIATION_RE = re.compile(
+    r"\b(?:sec|secs|s|ss|no|nos|art|arts|cl|r|o|vs|v|viz|i\.e|e\.g|etc|govt|dept|hon'ble|mr|mrs|ms|dr)\.$",
+    re.IGNORECASE,
+)
+
+
+def split_sentences(text: str):
+    sentences = []
+    for part in SENTENCE_SPLIT_RE.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        # Glue abbreviations and short fragments ("(a)", "1.") to the previous sentence
+        if sentences and (ABBREVIATION_RE.search(sentences[-1]) or len(sentences[-1]) < MIN_SENTENCE_CHARS):
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+class ContextCompressor:
+
+    def __init__(self, embeddings, budget_tokens: int = DEFAULT_BUDGET, count_tokens=estimate_tokens):
+        self.embeddings = embeddings
+        self.budget_tokens = budget_tokens
+        self.count_tokens = count_tokens
+        self.stats = {"calls": 0, "compressed": 0, "tokens_in": 0, "tokens_out": 0}
+
+    def compress(self, query: str, docs):
+        """
+        Returns (docs, report). `docs` are new Documents (the retrieved ones
+        may be shared with other sessions); report has the token counts
+        before / after and the number of sentences kept.
+        """
+        docs = list(docs or [])
+        tokens_in = sum(self.count_tokens(d.page_content) for d in docs)
+        self.stats["calls"] += 1
+        self.stats["tokens_in"] += tokens_in
+
+        if tokens_in <= self.budget_tokens:
+            self.stats["tokens_out"] += tokens_in
+            return docs, {"context_tokens_raw": tokens_in}
+
+        # (doc index, sentence) for every sentence of every chunk
+        sentences = [(i, s) for i, d in enumerate(docs) for s in split_sentences(d.page_content)]
+        scores = self._score(query, [s for _, s in sentences])
+
+        kept, used = set(), 0
+        for row in np.argsort(-scores):
+            cost = self.count_tokens(sentences[row][1]) + 1
+            if used + cost > self.budget_tokens:
+                if kept:
+                    continue       # a shorter, lower-scored sentence may still fit
+                # Even the best sentence is over budget: keep it, the assembler truncates
+            kept.add(int(row))
+            used += cost
+
+        compressed = []
+        for i, doc in enumerate(docs):
+            parts = [s for row, (d, s) in enumerate(sentences) if d == i and row in kept]
+            if parts:
+                compressed.append(Document(
+                    page_content=" ".join(parts),
+                    metadata={**(doc.metadata or {}), "compressed": True},
+                    id=doc.id,
+                ))
+
+        tokens_out = sum(self.count_tokens(d.page_content) for d in compressed)
+        self.stats["compressed"] += 1
+        self.stats["tokens_out"] += tokens_out
+        return compressed, {
+            "context_tokens_raw": tokens_in,
+            "sentences_kept": len(kept),
+            "sentences_total": len(sentences),
+        }
+
+    def _score(self, query, sentences):
+        # A cache hit only if something else embedded this query this turn
+        # (centroid routing, FAQ / answer cache lookup); keyword routing does not
+        query_vec = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        matrix = np.asarray(self.embeddings.embed_documents(sentences), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        query_vec /= np.linalg.norm(query_vec) + 1e-12
+        return matrix @ query_vec
@@ -2,11 +2,14 @@
 
 import os
 import json
+import asyncio
 from fpdf import FPDF
 import datetime
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
+
+from src.llm_client import get_chat_model, PRIORITY_DOCUMENT
+from src.model_cascade import LARGE_MODEL
 
 
 class DocumentGeneratorChain:
@@ -18,8 +21,9 @@ class DocumentGeneratorChain:
     - RAG legal context
     """
 
-    def __init__(self, model_name="llama2", template_dir="src/templates"):
-        self.llm = ChatOllama(model=model_name, temperature=0.2, max_tokens=700)
+    def __init__(self, model_name=LARGE_MODEL, template_dir="src/templates"):
+        # Drafting always uses the large model tier
+        self.llm = get_chat_model(model_name, temperature=0.2, num_predict=700, priority=PRIORITY_DOCUMENT)
         self.template_dir = template_dir
 
         self.prompt_template = ChatPromptTemplate.from_messages([
@@ -32,10 +36,11 @@ Follow these rules:
 - Use placeholders where information is missing.
 - Maintain correct legal formatting.
 """),
-            ("system", "User memory:\n{memory}"),
-            ("system", "Relevant legal context:\n{context}"),
+            # Static per template first (prefix reuse), per-request parts last
             ("system", "Template title: {title}"),
             ("system", "Template instructions: {instructions}"),
+            ("system", "User memory:\n{memory}"),
+            ("system", "Relevant legal context:\n{context}"),
             ("system", "Template fields filled by user:\n{fields}"),
             ("user", "Generate the complete legal document now.")
         ])
@@ -55,6 +60,9 @@ Follow these rules:
         # but the prompt expects them. We can pass empty strings or simple defaults.
         return self.generate_document(template_name, field_values, memory_string="", rag_context="")
 
+    async def agenerate(self, template_name, field_values, user_query):
+        return await self.agenerate_document(template_name, field_values, memory_string="", rag_context="")
+
     # ------------------------------------------------------------
     # Generate legal draft using LLM
     # ------------------------------------------------------------
@@ -65,6 +73,34 @@ Follow these rules:
         memory_string: str = "",
         rag_context: str = ""
     ):
+        prompt = self._build_prompt(template_name, user_inputs, memory_string, rag_context)
+
+        response = self.llm.invoke(prompt)
+        content = response.content.strip()
+        
+        # Generate PDF
+        pdf_path = self.save_pdf(content)
+        
+        return pdf_path, content
+
+    async def agenerate_document(
+        self,
+        template_name: str,
+        user_inputs: dict,
+        memory_string: str = "",
+        rag_context: str = ""
+    ):
+        """Async variant of generate_document (PDF writing runs in a thread)."""
+        prompt = self._build_prompt(template_name, user_inputs, memory_string, rag_context)
+
+        response = await self.llm.ainvoke(prompt)
+        content = response.content.strip()
+
+        pdf_path = await asyncio.to_thread(self.save_pdf, content)
+
+        return pdf_path, content
+
+    def _build_prompt(self, template_name, user_inputs, memory_string, rag_context):
         template = self.load_template(template_name)
 
         # Format fields text block
@@ -73,7 +109,7 @@ Follow these rules:
             for key, label in template["fields"].items()
         )
 
-        prompt = self.prompt_template.format(
+        return self.prompt_template.format(
             memory=memory_string or "None",
             context=rag_context or "None",
             title=template["title"],
@@ -81,14 +117,6 @@ Follow these rules:
             fields=fields_text
         )
 
-        response = self.llm.invoke(prompt)
-        content = response.content.strip()
-        
-        # Generate PDF
-        pdf_path = self.save_pdf(content)
-        
-        return pdf_path, content
-
     # ------------------------------------------------------------
     # Export to PDF
     # ------------------------------------------------------------
@@ -0,0 +1,86 @@
+# src/domains.py
+"""
+Legal domains used to partition the corpus.
+
+Ingestion tags every chunk with metadata["domain"] (and, with
+--namespaces, upserts it into the Pinecone namespace of that name); the
+intent router maps a query to the one or few domains it mentions, and
+PartitionedRetriever (src/retriever.py) searches only those partitions.
+Chunks and queries that match no domain belong to DEFAULT_DOMAIN; a query
+with no domain cue (or too many) searches every partition.
+"""
+
+import os
+import re
+
+
+DOMAIN_KEYWORDS = {
+    "criminal": [
+        r"fir", r"zero fir", r"police", r"arrest(?:ed)?", r"bail", r"warrant",
+        r"theft|stolen|robbery", r"fraud|cheat(?:ed|ing)?", r"cyber ?crime",
+        r"assault|murder|hurt", r"ipc|crpc|bns|bnss", r"cognizable", r"magistrate",
+        r"accused", r"offence|offense",
+    ],
+    "rti": [
+        r"rti", r"right to information", r"public information officer", r"pio",
+        r"information commission", r"first appellate authority",
+    ],
+    "tenancy": [
+        r"tenants?", r"tenancy", r"landlord", r"rent(?:ed|al)?", r"lease",
+        r"evict(?:s|ed|ion)?", r"security deposit", r"rent controller",
+    ],
+    "family": [
+        r"divorce", r"maintenance", r"custody", r"alimony", r"marriage",
+        r"domestic violence", r"dowry", r"husband|wife", r"adoption", r"guardian",
+    ],
+    "certificates": [
+        r"certificates?", r"income certificate", r"caste certificate",
+        r"birth certificate", r"death certificate", r"domicile", r"tahsildar",
+    ],
+}
+DEFAULT_DOMAIN = "general"
+DOMAINS = list(DOMAIN_KEYWORDS) + [DEFAULT_DOMAIN]
+
+# A query touching more domains than this searches the whole corpus
+MAX_QUERY_DOMAINS = int(os.getenv("MAX_QUERY_DOMAINS", "2"))
+
+
+def compile_domains(keywords=DOMAIN_KEYWORDS):
+    """Single word-bounded alternation with one named group per domain."""
+    groups = "|".join(
+        f"(?P<{domain}>{'|'.join(f'(?:{p})' for p in patterns)})"
+        for domain, patterns in keywords.items()
+    )
+    return re.compile(rf"\b(?:{groups})\b")
+
+
+DOMAIN_PATTERN = compile_domains()
+
+
+def domain_hits(text: str, pattern=DOMAIN_PATTERN):
+    """{domain: number of cue matches} in `text`."""
+    hits = {}
+    for m in pattern.finditer(text.lower()):
+        hits[m.lastgroup] = hits.get(m.lastgroup, 0) + 1
+    return hits
+
+
+def query_domains(text: str, max_domains: int = MAX_QUERY_DOMAINS):
+    """Domains to search for a query, most mentioned first; () means all."""
+    hits = domain_hits(text)
+    if not hits or len(hits) > max_domains:
+        return ()
+    return tuple(sorted(hits, key=hits.get, reverse=True))
+
+
+def chunk_domain(text: str, source: str = "") -> str:
+    """
+    Domain of an ingested chunk: a cue in the source path ("rti_act.pdf",
+    "data/tenancy/...") labels the whole file, otherwise the chunk's most
+    frequent domain cue wins.
+    """
+    from_source = domain_hits(re.sub(r"[_\-/\\.]+", " ", source))
+    if from_source:
+        return max(from_source, key=from_source.get)
+    hits = domain_hits(text)
+    return max(hits, key=hits.get) if hits else DEFAULT_DOMAIN
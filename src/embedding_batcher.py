@@ -0,0 +1,130 @@
+# src/embedding_batcher.py
+"""
+Micro-batching front for LocalSentenceTransformerEmbeddings.
+
+Concurrent embed_query() calls that arrive within a small time window (or until
+`max_batch` texts are waiting) are encoded with ONE batched model.encode call
+and the vectors are scattered back to the waiting callers. MiniLM on CPU is
+several times more efficient per sentence in a batch than one-by-one.
+
+Both sync (embed_query) and asyncio (aembed_query) callers are supported.
+"""
+
+import os
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from langchain.embeddings.base import Embeddings
+
+from src.embeddings import normalize_query
+
+
+class EmbeddingBatcher(Embeddings):
+
+    def __init__(self, embeddings, max_batch: int = None, max_wait_ms: float = None):
+        self.embeddings = embeddings
+        self.max_batch = max_batch or int(os.getenv("EMBED_BATCH_SIZE", "32"))
+        self.max_wait = (
+            max_wait_ms if max_wait_ms is not None
+            else float(os.getenv("EMBED_BATCH_WINDOW_MS", "3"))
+        ) / 1000.0
+
+        # A sync caller never waits forever, even if the worker is stuck
+        self.result_timeout = float(os.getenv("EMBED_RESULT_TIMEOUT", "30"))
+
+        self.batches = 0
+        self.batched_items = 0
+
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    # ---------------------------------------------------------
+    # LangChain Embeddings interface
+    # ---------------------------------------------------------
+    def embed_query(self, text):
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+        return self._submit(text).result(timeout=self.result_timeout)
+
+    async def aembed_query(self, text):
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+        return await asyncio.wrap_future(self._submit(text))
+
+    def embed_documents(self, texts):
+        # Document batches are already large; no need to queue them
+        return self.embeddings.embed_documents(texts)
+
+    def cache_stats(self):
+        return self.embeddings.cache_stats()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.batched_items,
+            "mean_batch_size": self.batched_items / self.batches if self.batches else 0.0,
+        }
+
+    # ---------------------------------------------------------
+    # Internals
+    # ---------------------------------------------------------
+    def _cached(self, text):
+        """Cache hits are answered on the caller's thread, skipping the queue."""
+        cache = getattr(self.embeddings, "query_cache", None)
+        if cache is None:
+            return None
+        return cache.get(normalize_query(text))
+
+    def _submit(self, text) -> Future:
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Requests whose caller was cancelled (e.g. a disconnected aembed_query) are dropped
+            batch = [(text, f) for text, f in self._collect() if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+
+            try:
+                vectors = self.embeddings.embed_queries(texts)
+            except Exception as e:
+                for _, future in batch:
+                    self._resolve(future.set_exception, e)
+                continue
+
+            self.batches += 1
+            self.batched_items += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                self._resolve(future.set_result, vector)
+
+    @staticmethod
+    def _resolve(setter, value):
+        # One bad future must not kill the worker thread
+        try:
+            setter(value)
+        except Exception as e:
+            print(f"⚠️ Embedding batcher could not deliver a result: {e}")
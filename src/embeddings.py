@@ -5,25 +5,92 @@ Uses a LOCAL SentenceTransformer model (MiniLM) for consistent RAG performance.
 """
 
 import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from langchain.embeddings.base import Embeddings
 from dotenv import load_dotenv
 
 load_dotenv()
 MODEL_PATH = os.getenv("MODEL_PATH")
+QUERY_CACHE_SIZE = int(os.getenv("EMBED_QUERY_CACHE_SIZE", "2048"))
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: lowercase, single spaces, no outer whitespace."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class QueryVectorCache:
+    """
+    Bounded LRU cache of query vectors.
+    Vectors live in one preallocated float32 array; the dict only maps
+    normalized text → row, so each entry costs dim * 4 bytes plus the key.
+    """
+
+    def __init__(self, size: int, dim: int):
+        self.size = size
+        self._vectors = np.zeros((size, dim), dtype=np.float32)
+        self._rows = OrderedDict()   # key → row, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self._rows.move_to_end(key)
+            self.hits += 1
+            return self._vectors[row].tolist()
+
+    def put(self, key: str, vector):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                if len(self._rows) < self.size:
+                    row = len(self._rows)
+                else:
+                    _, row = self._rows.popitem(last=False)
+            self._rows[key] = row
+            self._rows.move_to_end(key)
+            self._vectors[row] = vector
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._rows),
+            "capacity": self.size,
+        }
+
 
 class LocalSentenceTransformerEmbeddings(Embeddings):
     """
     LangChain-compatible wrapper for your local SentenceTransformer model.
+    Query vectors are cached (LRU, keyed on normalized text) so repeated
+    queries skip the model entirely.
     """
 
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, query_cache_size: int = QUERY_CACHE_SIZE):
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Embedding model not found at: {model_path}")
 
         print(f"🔧 Loading embeddings model from: {model_path}")
         self.model = SentenceTransformer(model_path)
 
+        self.query_cache = None
+        if query_cache_size > 0:
+            dim = self.model.get_sentence_embedding_dimension()
+            self.query_cache = QueryVectorCache(query_cache_size, dim)
+
     def embed_documents(self, texts):
         """
         Embed multiple documents → returns list of vectors.
@@ -32,18 +99,62 @@ class LocalSentenceTransformerEmbeddings(Embeddings):
 
     def embed_query(self, text):
         """
-        Embed a single query → returns a vector.
+        Embed a single query → returns a vector (served from cache if seen).
+        The normalized text is embedded on every path, so a query gets the same
+        vector whether or not it was cached.
         """
-        return self.model.encode(text, show_progress_bar=False).tolist()
+        key = normalize_query(text)
+        if self.query_cache is None:
+            return self.model.encode(key, show_progress_bar=False).tolist()
+
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        vector = self.model.encode(key, show_progress_bar=False)
+        self.query_cache.put(key, vector)
+        return vector.tolist()
+
+    def embed_queries(self, texts):
+        """
+        Embed many queries with one batched encode (used by EmbeddingBatcher).
+        Duplicates are encoded once and every result is added to the cache.
+        """
+        keys = [normalize_query(t) for t in texts]
+        unique = list(dict.fromkeys(keys))
+
+        vectors = self.model.encode(unique, batch_size=len(unique), show_progress_bar=False)
+        by_key = dict(zip(unique, vectors))
+
+        if self.query_cache is not None:
+            for key, vector in by_key.items():
+                self.query_cache.put(key, vector)
+
+        return [by_key[k].tolist() for k in keys]
+
+    def cache_stats(self):
+        """Hit-rate statistics of the query cache."""
+        return self.query_cache.stats() if self.query_cache else None
 
 
 # ---------------------------------------------------------
 # Utility function to load embeddings (used across project)
 # ---------------------------------------------------------
 
-def load_embedding_model():
+def load_embedding_model(batched: bool = None):
     """
     Loads your local MiniLM sentence-transformer model.
     Edit path below if you move the model folder.
+
+    With batching on (EMBED_BATCHING=1, the default) concurrent embed_query
+    calls are micro-batched by EmbeddingBatcher.
     """
-    return LocalSentenceTransformerEmbeddings(model_path=MODEL_PATH)
+    embeddings = LocalSentenceTransformerEmbeddings(model_path=MODEL_PATH)
+
+    if batched is None:
+        batched = os.getenv("EMBED_BATCHING", "1") != "0"
+    if not batched:
+        return embeddings
+
+    from src.embedding_batcher import EmbeddingBatcher
+    return EmbeddingBatcher(embeddings)
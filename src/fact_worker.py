@@ -0,0 +1,73 @@
+# src/fact_worker.py
+"""
+Background fact extraction.
+
+MemoryChatbot's LLM fallback costs a full ChatOllama call. Instead of running
+it before the answer is generated, messages are queued to a small worker pool
+shared by all sessions; extracted facts are merged into the owning session's
+memory_store with per-fact versions so a slow extraction of an old message
+never overwrites a newer fact.
+
+Messages of one session that pile up while its job is still queued are
+extracted together in a single JSON-mode call (up to `max_batch`).
+
+Personal questions can wait for the pending extractions of their session
+(MemoryChatbot.wait_for_pending_facts) before memory is read.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FactExtractionWorker:
+
+    def __init__(self, workers: int = None, max_batch: int = None):
+        workers = workers or int(os.getenv("FACT_WORKERS", "2"))
+        self.max_batch = max_batch or int(os.getenv("FACT_BATCH_SIZE", "8"))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fact-extract")
+        self._lock = threading.Lock()
+        self._open = {}   # memory → (batch list, future) of its not-yet-started job
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "llm_calls": 0, "facts": 0}
+
+    def submit(self, memory, text: str, version: int):
+        """Queue one message of `memory`'s session; returns the Future of its batch."""
+        with self._lock:
+            self.stats["submitted"] += 1
+
+            batch, future = self._open.get(memory, (None, None))
+            if batch is not None and len(batch) < self.max_batch:
+                batch.append((text, version))
+                return future
+
+            batch = [(text, version)]
+            future = self._pool.submit(self._run, memory, batch)
+            self._open[memory] = (batch, future)
+            return future
+
+    def _run(self, memory, batch):
+        # Close the batch: later messages start a new job
+        with self._lock:
+            if self._open.get(memory, (None,))[0] is batch:
+                del self._open[memory]
+            items = list(batch)
+
+        try:
+            stored = memory._extract_facts_llm_batch(items)
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += len(items)
+            raise
+
+        with self._lock:
+            self.stats["completed"] += len(items)
+            self.stats["llm_calls"] += 1
+            self.stats["facts"] += stored
+        return stored
+
+    @property
+    def pending(self):
+        return self.stats["submitted"] - self.stats["completed"] - self.stats["failed"]
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,293 @@
+# src/faq_index.py
+"""
+Precomputed answers for the most frequent legal questions.
+
+A curated FAQ list (src/faq/seed.json: question, paraphrases, answer) is
+compiled offline into FAQ_INDEX_DIR:
+- questions-v<N>.npy : float16 unit vectors, one row per question / paraphrase
+- faq.json           : {"version", "built_at", "dim", "matrix", "rows", "entries"}
+                       matrix = file name of this build's vectors,
+                       rows[i] = index into entries of matrix row i
+
+At query time CombinedLegalChatbot checks the index before the answer
+cache, the retriever and the LLM; a match above FAQ_THRESHOLD returns the
+vetted answer directly. Only entries marked "vetted" are served. The seed
+answers ship unvetted, so an index built from the default seed serves
+nothing: the FAQ shortcut stays inactive until a reviewer has checked
+answers and set "vetted": true. Entries without an answer can be
+drafted with --generate (retriever + large model); they are stored
+unvetted for review.
+
+Every build bumps the version; running servers pick up a new build
+within FAQ_RELOAD_INTERVAL seconds (or via reload()) without a restart.
+
+Build:  python -m src.faq_index build [--seed PATH] [--generate]
+Query:  python -m src.faq_index query "how do i file an rti"
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.embeddings import load_embedding_model
+
+
+DEFAULT_FAQ_DIR = os.getenv("FAQ_INDEX_DIR", "faq_index")
+DEFAULT_SEED = os.path.join(os.path.dirname(__file__), "faq", "seed.json")
+
+
+class FAQIndex:
+
+    def __init__(self, embeddings, index_dir: str = DEFAULT_FAQ_DIR, threshold: float = None,
+                 reload_interval: float = None):
+        self.embeddings = embeddings
+        self.index_dir = index_dir
+        self.threshold = threshold or float(os.getenv("FAQ_THRESHOLD", "0.88"))
+        self.reload_interval = reload_interval or float(os.getenv("FAQ_RELOAD_INTERVAL", "30"))
+
+        self.version = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._entries = []
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0}
+
+        if os.path.exists(self._path("faq.json")):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    # ---------------------------------------------------------
+    # Loading / hot reload
+    # ---------------------------------------------------------
+    def load(self):
+        """Load the current build (atomically replaces the served index)."""
+        mtime = os.path.getmtime(self._path("faq.json"))
+        with open(self._path("faq.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        # Each build writes its own matrix file, so these vectors belong to
+        # exactly this faq.json even if a rebuild lands in between
+        try:
+            matrix = np.load(self._path(meta.get("matrix", "questions.npy"))).astype(np.float32)
+        except OSError:
+            matrix = None
+
+        if matrix is None or matrix.shape[0] != len(meta["rows"]) \
+                or (len(matrix) and matrix.shape[1] != meta["dim"]):
+            # A newer build replaced this one mid-load; pick it up on the next check
+            print("⚠️ FAQ index files out of sync; keeping the loaded version.")
+            return False
+
+        served = [i for i, e in enumerate(meta["entries"]) if e.get("vetted")]
+        keep = np.isin(np.asarray(meta["rows"], dtype=np.int32), served)
+
+        with self._lock:
+            self._matrix = matrix[keep]
+            self._rows = np.asarray(meta["rows"], dtype=np.int32)[keep]
+            self._entries = meta["entries"]
+            self.version = meta["version"]
+            self._mtime = mtime
+
+        print(f"📘 FAQ index v{self.version} loaded: {len(served)} answers, {int(keep.sum())} questions")
+        if not served:
+            print("⚠️ No vetted FAQ answers: the FAQ index serves nothing until entries are vetted.")
+        return True
+
+    def maybe_reload(self):
+        """Reload if a newer build exists (checked at most every reload_interval s)."""
+        if not self._reload_due():
+            return False
+        return self._reload_if_changed()
+
+    def reload(self):
+        return self._reload_if_changed()
+
+    def _reload_due(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.reload_interval
+        return True
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self._path("faq.json"))
+        except OSError:
+            return False
+        if mtime != self._mtime:
+            return self.load()
+        return False
+
+    # ---------------------------------------------------------
+    # Lookup
+    # ---------------------------------------------------------
+    def lookup(self, query: str):
+        """Vetted FAQ entry (+ "score") for a close enough question, or None."""
+        self.maybe_reload()
+        if not len(self._rows):
+            return None
+        return self.lookup_vector(self.embeddings.embed_query(query))
+
+    async def alookup(self, query: str):
+        # The stat + load is file I/O; keep it off the event loop
+        if self._reload_due():
+            await asyncio.to_thread(self._reload_if_changed)
+        if not len(self._rows):
+            return None
+        if hasattr(self.embeddings, "aembed_query"):
+            vector = await self.embeddings.aembed_query(query)
+        else:
+            vector = await asyncio.to_thread(self.embeddings.embed_query, query)
+        return self.lookup_vector(vector)
+
+    def lookup_vector(self, vector):
+        vec = np.asarray(vector, dtype=np.float32)
+        vec /= np.linalg.norm(vec) or 1.0
+
+        with self._lock:
+            self.stats["lookups"] += 1
+            if not len(self._rows) or vec.shape[0] != self._matrix.shape[1]:
+                return None
+            sims = self._matrix @ vec
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            self.stats["hits"] += 1
+            return {**self._entries[self._rows[best]], "score": float(sims[best])}
+
+
+# ---------------------------------------------------------
+# Offline build
+# ---------------------------------------------------------
+FAQ_PROMPT = """You are a concise Indian legal assistant.
+Answer the question in 1-3 factual sentences using only the legal context.
+If the context is not enough, say "NEEDS REVIEW".
+
+Legal context:
+{context}
+
+Question: {question}
+Answer:"""
+
+
+def generate_answer(question, llm, retriever):
+    """Draft an answer for an FAQ entry (stored unvetted for review)."""
+    docs = retriever.invoke(question)
+    context = "\n---\n".join(d.page_content for d in docs) or "None"
+    return llm.invoke(FAQ_PROMPT.format(context=context, question=question)).content.strip()
+
+
+def build_index(entries, embeddings, index_dir: str = DEFAULT_FAQ_DIR, llm=None, retriever=None):
+    """Embed every question + paraphrase and write a new index version."""
+    entries = [dict(e) for e in entries]
+    for entry in entries:
+        if not entry.get("answer") and llm is not None:
+            entry["answer"] = generate_answer(entry["question"], llm, retriever)
+            entry["vetted"] = False
+            print(f"📝 Drafted (unvetted) answer for {entry['id']}: {entry['answer']}")
+
+    texts, rows = [], []
+    for i, entry in enumerate(entries):
+        if not entry.get("answer"):
+            continue
+        for text in [entry["question"]] + entry.get("paraphrases", []):
+            texts.append(text)
+            rows.append(i)
+
+    if texts:
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        # Nothing answered yet: write an empty index that serves no FAQ
+        vectors = np.zeros((0, 0), dtype=np.float32)
+
+    os.makedirs(index_dir, exist_ok=True)
+    meta_path = os.path.join(index_dir, "faq.json")
+    version = 0
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            version = json.load(f).get("version", 0)
+
+    matrix_name = f"questions-v{version + 1}.npy"
+    meta = {
+        "version": version + 1,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dim": int(vectors.shape[1]),
+        "matrix": matrix_name,
+        "rows": rows,
+        "entries": entries,
+    }
+
+    # Matrix first, metadata last: servers reload when faq.json changes
+    path = os.path.join(index_dir, matrix_name)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, vectors.astype(np.float16))
+    os.replace(path + ".tmp", path)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    # Keep the previous matrix for servers still loading the old faq.json
+    keep = {matrix_name, f"questions-v{version}.npy"}
+    for name in os.listdir(index_dir):
+        if name.startswith("questions") and name.endswith(".npy") and name not in keep:
+            os.remove(os.path.join(index_dir, name))
+
+    vetted = sum(1 for e in entries if e.get("vetted"))
+    print(f"✅ FAQ index v{meta['version']} written to {index_dir}: "
+          f"{len(entries)} entries ({vetted} vetted), {len(texts)} questions")
+    return meta
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Build or query the legal FAQ answer index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="compile the FAQ list into a new index version")
+    build.add_argument("--seed", default=DEFAULT_SEED, help="curated FAQ list (JSON)")
+    build.add_argument("--out", default=DEFAULT_FAQ_DIR)
+    build.add_argument("--generate", action="store_true",
+                       help="draft missing answers with the retriever + large model (stored unvetted)")
+
+    query = sub.add_parser("query", help="look up one question")
+    query.add_argument("text")
+    query.add_argument("--out", default=DEFAULT_FAQ_DIR)
+    args = parser.parse_args()
+
+    embeddings = load_embedding_model(batched=False)
+
+    if args.command == "build":
+        with open(args.seed, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        llm = retriever = None
+        if args.generate:
+            from src.retriever import build_retriever
+            from src.combined_chain import load_llm
+            llm = load_llm()
+            retriever = build_retriever(5, embeddings=embeddings)
+        build_index(entries, embeddings, args.out, llm=llm, retriever=retriever)
+    else:
+        match = FAQIndex(embeddings, args.out).lookup(args.text)
+        print(json.dumps(match, ensure_ascii=False, indent=2) if match else "No FAQ match.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# src/history_store.py
+"""
+Bounded conversation history with a rolling summary.
+
+- the last `max_messages` turns are kept as preformatted "User: ..." /
+  "Assistant: ..." lines in a ring buffer, so per-session memory is O(1)
+- turns that fall out of the window are folded into a running summary by a
+  background summarizer (an LLM call), capped at `summary_tokens`
+- render() returns summary + recent turns, cached until the next change,
+  so the prompt size stays stable however long the user talks
+"""
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage, AIMessage
+
+
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "6"))
+SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "120"))
+
+_summary_pool = None
+_summary_pool_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough llama tokenizer estimate: ~4 characters per token."""
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = "start") -> str:
+    """Cut `text` on a word boundary so it fits `max_tokens`."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * 4
+    if keep == "end":
+        cut = text[-limit:]
+        return cut[cut.find(" ") + 1:] if " " in cut else cut
+    cut = text[:limit]
+    return cut[:cut.rfind(" ")] if " " in cut else cut
+
+
+def _get_summary_pool():
+    global _summary_pool
+    with _summary_pool_lock:
+        if _summary_pool is None:
+            _summary_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        return _summary_pool
+
+
+class BoundedHistory:
+
+    def __init__(self, max_messages: int = HISTORY_WINDOW, summary_tokens: int = SUMMARY_TOKENS, summarizer=None):
+        """
+        summarizer(summary: str, evicted_lines: list[str], max_tokens: int) -> str
+        If None, evicted turns are kept extractively (most recent text first).
+        """
+        self.max_messages = max_messages
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+
+        self.summary = ""
+        self._turns = deque(maxlen=max_messages)   # (type, content, line)
+        self._evicted = []                         # lines waiting to be summarized
+        self._refreshing = False
+        self._rendered = None
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    def add_user_message(self, text: str):
+        self._append("human", text, "User: " + text)
+
+    def add_ai_message(self, text: str):
+        self._append("ai", text, "Assistant: " + text)
+
+    def add_message(self, message):
+        """ChatMessageHistory-compatible entry point."""
+        if message.type == "human":
+            self.add_user_message(message.content)
+        else:
+            self.add_ai_message(message.content)
+
+    @property
+    def messages(self):
+        """Recent turns as LangChain messages (older turns live in the summary)."""
+        with self._lock:
+            turns = list(self._turns)
+        return [
+            HumanMessage(content=c) if t == "human" else AIMessage(content=c)
+            for t, c, _ in turns
+        ]
+
+    def render(self) -> str:
+        with self._lock:
+            if self._rendered is None:
+                parts = []
+                if self.summary:
+                    parts.append(f"Earlier in the conversation: {self.summary}")
+                parts.extend(line for _, _, line in self._turns)
+                self._rendered = "\n".join(parts)
+            return self._rendered
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+            self._evicted = []
+            self.summary = ""
+            self._rendered = None
+
+    # ---------------------------------------------------------
+    def _append(self, kind, content, line):
+        with self._lock:
+            if len(self._turns) == self._turns.maxlen:
+                self._evicted.append(self._turns[0][2])
+            self._turns.append((kind, content, line))
+            self._rendered = None
+
+            schedule = self._evicted and not self._refreshing
+            if schedule:
+                self._refreshing = True
+
+        if schedule:
+            if self.summarizer is None:
+                self._refresh()
+            else:
+                _get_summary_pool().submit(self._refresh)
+
+    def _refresh(self):
+        """Fold evicted turns into the summary until none are left."""
+        while True:
+            with self._lock:
+                lines, self._evicted = self._evicted, []
+                summary = self.summary
+                if not lines:
+                    self._refreshing = False
+                    return
+
+            new_summary = None
+            if self.summarizer is not None:
+                try:
+                    new_summary = self.summarizer(summary, lines, self.summary_tokens)
+                except Exception:
+                    new_summary = None
+            if not new_summary:
+                # Extractive fallback: keep the most recent text that fits
+                new_summary = " ".join([summary] + lines).strip()
+                new_summary = truncate_to_tokens(new_summary, self.summary_tokens, keep="end")
+
+            with self._lock:
+                self.summary = truncate_to_tokens(new_summary.strip(), self.summary_tokens)
+                self._rendered = None
@@ -0,0 +1,382 @@
+# src/ingest.py
+"""
+Corpus ingestion: legal source documents → chunks → embeddings → vector index.
+
+    python -m src.ingest data/bare_acts data/faqs.json --backend local
+
+Pipeline:
+- streams PDF / TXT / JSON files through a text splitter
+- embeds new chunks in large batches with load_embedding_model()
+- bulk-upserts to Pinecone (bounded parallel requests) or the local index
+- keeps the local BM25 index (src/bm25.py) in sync for hybrid retrieval
+- tags every chunk with its legal domain (metadata["domain"], src/domains.py);
+  with --namespaces each domain goes to its own Pinecone namespace
+- keeps a content-hash manifest so re-runs only embed changed chunks and
+  delete the stale ones; files whose sha256 is unchanged are skipped entirely.
+  The manifest records its target (backend / index / namespace mode); a run
+  against another target re-ingests everything. Source keys are relative to
+  the manifest's directory (or --root), not the current directory.
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dotenv import load_dotenv
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.embeddings import load_embedding_model
+from src.bm25 import BM25Index
+from src.domains import DOMAINS, chunk_domain
+
+
+SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".json"}
+DEFAULT_MANIFEST = os.getenv("INGEST_MANIFEST", "ingest_manifest.json")
+
+
+# ---------------------------------------------------------
+# Loading
+# ---------------------------------------------------------
+def iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                        yield os.path.join(root, name)
+        elif os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS:
+            yield path
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_records(path):
+    """Yield (text, metadata) records of one source file."""
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == ".txt":
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            yield f.read(), {}
+
+    elif ext == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise ImportError("❌ PDF ingestion needs `pypdf` (pip install pypdf)")
+
+        for page_no, page in enumerate(PdfReader(path).pages, start=1):
+            yield page.extract_text() or "", {"page": page_no}
+
+    elif ext == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        # Accept a list of strings / {"text": ..., "metadata": {...}} records
+        # or a single such record
+        for record in data if isinstance(data, list) else [data]:
+            if isinstance(record, str):
+                yield record, {}
+            elif isinstance(record, dict) and record.get("text"):
+                yield record["text"], dict(record.get("metadata", {}))
+
+
+def chunk_id(source, text):
+    """Content hash: identical chunk text in the same source keeps its id."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+# ---------------------------------------------------------
+# Writers
+# ---------------------------------------------------------
+class PineconeWriter:
+    """
+    Bulk upserts to Pinecone with a bounded number of requests in flight.
+    With partitioned=True every chunk goes to the namespace of its domain
+    and to the default namespace, which keeps the whole corpus for queries
+    without a domain cue (one query instead of one per partition).
+    """
+
+    def __init__(self, workers=4, namespace=None, partitioned=False):
+        from src.retriever import init_pinecone
+
+        self.index = init_pinecone()
+        self.namespace = namespace
+        self.partitioned = partitioned
+        self.target = "pinecone:namespaces" if partitioned else f"pinecone:{namespace or ''}"
+        if partitioned:
+            self.namespace = None      # whole-corpus copy lives in the default namespace
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.max_in_flight = workers * 2
+        self.in_flight = set()
+
+    def upsert(self, ids, texts, metadatas, vectors):
+        records = [
+            {"id": i, "values": v, "metadata": {**m, "text": t}}
+            for i, t, m, v in zip(ids, texts, metadatas, vectors)
+        ]
+        groups = {self.namespace: records}
+        if self.partitioned:
+            for record in records:
+                groups.setdefault(record["metadata"]["domain"], []).append(record)
+
+        # Pinecone recommends ≤ 100 vectors per upsert request
+        for namespace, group in groups.items():
+            for start in range(0, len(group), 100):
+                self._submit(self.index.upsert, vectors=group[start:start + 100], namespace=namespace)
+
+    @staticmethod
+    def namespaces_of(target):
+        """Namespaces a "pinecone:..." target writes to."""
+        if target == "pinecone:namespaces":
+            return list(DOMAINS) + [None]
+        return [target.split(":", 1)[1] or None]
+
+    def delete(self, ids, target=None):
+        # The manifest does not record chunk domains; deleting missing ids is a no-op
+        for namespace in self.namespaces_of(target or self.target):
+            for start in range(0, len(ids), 1000):
+                self._submit(self.index.delete, ids=ids[start:start + 1000], namespace=namespace)
+
+    def can_delete_from(self, target):
+        return bool(target) and target.startswith("pinecone:")
+
+    def drain(self):
+        """Wait for every request in flight (deletes must land before re-upserts)."""
+        for f in self.in_flight:
+            f.result()
+        self.in_flight = set()
+
+    def _submit(self, fn, **kwargs):
+        if len(self.in_flight) >= self.max_in_flight:
+            done, self.in_flight = wait(self.in_flight, return_when=FIRST_COMPLETED)
+            for f in done:
+                f.result()
+        self.in_flight.add(self.pool.submit(fn, **kwargs))
+
+    def close(self):
+        self.drain()
+        self.pool.shutdown()
+
+
+class LocalWriter:
+    """Writes into the offline LocalVectorStore; files are rewritten once at close()."""
+
+    def __init__(self, embeddings, index_dir=None):
+        from src.local_store import LocalVectorStore, DEFAULT_INDEX_DIR
+
+        self.store = LocalVectorStore(embeddings, index_dir=index_dir or DEFAULT_INDEX_DIR)
+        self.target = f"local:{os.path.abspath(self.store.index_dir)}"
+
+    def upsert(self, ids, texts, metadatas, vectors):
+        self.store.add_texts(texts, metadatas=metadatas, ids=ids, embeddings=vectors)
+
+    def delete(self, ids):
+        self.store.delete(ids)
+
+    def can_delete_from(self, target):
+        return False
+
+    def drain(self):
+        pass
+
+    def close(self):
+        self.store.save()
+
+
+# ---------------------------------------------------------
+# Ingestion
+# ---------------------------------------------------------
+class Ingestor:
+
+    def __init__(
+        self,
+        writer,
+        embeddings,
+        manifest_path=DEFAULT_MANIFEST,
+        batch_size=256,
+        chunk_size=1000,
+        chunk_overlap=150,
+        lexical_index=None,
+        root=None,
+    ):
+        self.writer = writer
+        self.embeddings = embeddings
+        self.lexical_index = lexical_index
+        self.manifest_path = manifest_path
+        self.batch_size = batch_size
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+
+        # Source keys (and so chunk ids) must not depend on the current directory
+        self.root = os.path.abspath(root or os.path.dirname(os.path.abspath(manifest_path)))
+
+        self.manifest = {"version": 0, "target": writer.target, "sources": {}}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+        self._pending = []   # (id, text, metadata) waiting to be embedded
+        self.stats = {"files": 0, "skipped_files": 0, "embedded": 0, "kept": 0, "deleted": 0}
+
+        if self.manifest.get("target") != writer.target:
+            self._switch_target(self.manifest.get("target"))
+
+    def _switch_target(self, previous):
+        """
+        The manifest describes another index (or predates targets): its file
+        hashes say nothing about this one, so every file is ingested again.
+        Chunks the previous target holds in the same Pinecone index are
+        deleted first.
+        """
+        print(f"⚠️ Manifest target {previous or 'unknown'} != {self.writer.target}; re-ingesting all files.")
+        if self.writer.can_delete_from(previous):
+            ids = [cid for entry in self.manifest["sources"].values() for cid in entry["chunks"]]
+            self.writer.delete(ids, target=previous)
+            self.writer.drain()
+            self.stats["deleted"] += len(ids)
+        self.manifest["target"] = self.writer.target
+        self.manifest["sources"] = {}
+
+    # -----------------------------------------------------
+    def run(self, paths, prune=False):
+        seen = set()
+
+        for path in iter_files(paths):
+            source = self.source_key(path)
+            seen.add(source)
+            self._ingest_file(path, source)
+
+        if prune:
+            for source in list(self.manifest["sources"]):
+                if source not in seen:
+                    self._delete(self.manifest["sources"].pop(source)["chunks"])
+
+        self._flush()
+        self.writer.close()
+        if self.lexical_index is not None:
+            self.lexical_index.save()
+
+        if self.stats["embedded"] or self.stats["deleted"]:
+            self.manifest["version"] += 1
+        self._save_manifest()
+        return self.stats
+
+    def source_key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def _ingest_file(self, path, source):
+        digest = file_hash(path)
+        previous = self.manifest["sources"].get(source)
+
+        if previous and previous["file_hash"] == digest:
+            self.stats["skipped_files"] += 1
+            return
+
+        self.stats["files"] += 1
+        old_ids = set(previous["chunks"]) if previous else set()
+        ids, seen = [], set()
+
+        for text, metadata in load_records(path):
+            for chunk in self.splitter.split_text(text):
+                cid = chunk_id(source, chunk)
+                if cid in seen:
+                    continue
+                seen.add(cid)
+                ids.append(cid)
+
+                if cid in old_ids:
+                    self.stats["kept"] += 1
+                    continue
+
+                domain = metadata.get("domain") or chunk_domain(chunk, source)
+                self._pending.append((cid, chunk, {**metadata, "source": source, "domain": domain}))
+                if len(self._pending) >= self.batch_size:
+                    self._flush()
+
+        self._delete(sorted(old_ids - seen))
+        self.manifest["sources"][source] = {"file_hash": digest, "chunks": ids}
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        ids, texts, metadatas = zip(*self._pending)
+        self._pending = []
+
+        vectors = self.embeddings.embed_documents(list(texts))
+        self.writer.upsert(list(ids), list(texts), list(metadatas), vectors)
+        if self.lexical_index is not None:
+            self.lexical_index.add(ids, texts, metadatas)
+        self.stats["embedded"] += len(ids)
+        print(f"⬆️  Upserted {self.stats['embedded']} chunks…")
+
+    def _delete(self, ids):
+        if ids:
+            self.writer.delete(list(ids))
+            if self.lexical_index is not None:
+                self.lexical_index.delete(ids)
+            self.stats["deleted"] += len(ids)
+
+    def _save_manifest(self):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Ingest legal documents into the vector index.")
+    parser.add_argument("paths", nargs="+", help="files or directories (PDF / TXT / JSON)")
+    parser.add_argument("--backend", default=os.getenv("VECTOR_BACKEND", "pinecone"),
+                        choices=["pinecone", "local"])
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--root", help="directory source paths are recorded relative to "
+                                       "(default: the manifest's directory)")
+    parser.add_argument("--batch-size", type=int, default=256, help="chunks per embedding batch")
+    parser.add_argument("--workers", type=int, default=4, help="parallel Pinecone upsert requests")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--no-bm25", action="store_true", help="do not update the BM25 index")
+    parser.add_argument("--namespaces", action="store_true",
+                        help="upsert each legal domain into its own Pinecone namespace")
+    parser.add_argument("--prune", action="store_true",
+                        help="delete chunks of sources that are no longer in the given paths")
+    args = parser.parse_args()
+
+    embeddings = load_embedding_model(batched=False)
+    if args.backend == "local":
+        writer = LocalWriter(embeddings)
+    else:
+        writer = PineconeWriter(workers=args.workers, partitioned=args.namespaces)
+
+    ingestor = Ingestor(
+        writer,
+        embeddings,
+        manifest_path=args.manifest,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        lexical_index=None if args.no_bm25 else BM25Index(),
+        root=args.root,
+    )
+    stats = ingestor.run(args.paths, prune=args.prune)
+    print(f"✅ Ingestion finished: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# src/intent_router.py
+"""
+Intent routing for CombinedLegalChatbot.
+
+Precompiled, word-bounded regex alternations (so "fir" no longer matches
+"first") find every legal / personal / greeting / document cue. Document
+cues contain legal ones ("write an RTI") and finditer never returns
+overlapping matches, so they are matched in a separate pass. Text with no keyword cue can fall back to a
+nearest-centroid classifier over cached MiniLM embeddings.
+
+Each route also carries the corpus partitions (src/domains.py) that
+retrieval should search for the message.
+"""
+
+import re
+
+import numpy as np
+
+from src.domains import query_domains
+
+
+# ---------------------------------------------------------
+# Keyword cues (regex fragments, matched on lowercase text)
+# ---------------------------------------------------------
+INTENT_KEYWORDS = {
+    "document": [
+        r"draft(?: me)? an?",
+        r"(?:write|prepare|generate|make|create) (?:an? |my )?(?:fir|rti|complaint|legal notice|notice|application)",
+        r"(?:fir|rti|complaint) (?:form|draft|document)",
+        r"income certificate",
+    ],
+    "personal": [
+        r"my name",
+        r"who am i",
+        r"where do i live",
+        r"i live",
+        r"i am a",
+        r"i am from",
+        r"what do i do",
+        r"what is my",
+        r"how old am i",
+        r"my (?:age|phone (?:number|no)|email|occupation|address|father|mother|location)",
+    ],
+    "legal": [
+        r"disputes?",
+        r"rights?",
+        r"laws?",
+        r"legal(?:ly)?",
+        r"illegal(?:ly)?",
+        r"how to file",
+        r"fir",
+        r"rti",
+        r"tenants?",
+        r"tenancy",
+        r"landlord",
+        r"evict(?:s|ed|ion)?",
+        r"harass(?:ed|ment)?",
+        r"police",
+        r"court",
+        r"section \d+[a-z]?",
+        r"ipc|crpc|cpc|bns|bnss",
+        r"bail",
+        r"plaint",
+        r"petition",
+        r"complaint",
+        r"lawyer|advocate",
+        r"divorce|maintenance|custody",
+        r"domestic violence|dowry",
+        r"encroach(?:ment)?",
+        r"property|inheritance",
+        r"consumer",
+        r"theft|stolen|fraud|cheat(?:ed|ing)?",
+    ],
+    "greeting": [
+        r"hi",
+        r"hello",
+        r"hey",
+        r"namaste",
+        r"good (?:morning|afternoon|evening)",
+        r"thanks?(?: you)?",
+        r"bye",
+    ],
+}
+
+# Exemplars for the embedding fallback (one centroid per intent)
+INTENT_EXEMPLARS = {
+    "legal": [
+        "what can I do if my landlord refuses to return the deposit",
+        "someone took my land and built a wall on it",
+        "my employer has not paid my salary for three months",
+        "the shopkeeper sold me a defective phone and refuses a refund",
+        "my husband beats me what should I do",
+    ],
+    "personal": [
+        "do you remember where I stay",
+        "tell me what you know about me",
+        "what job do I have",
+        "remind me of my details",
+    ],
+    "greeting": [
+        "good to meet you",
+        "how are you doing today",
+        "thank you so much for the help",
+        "see you later",
+    ],
+    "document": [
+        "I need a written application for the authorities",
+        "please prepare the paperwork for me",
+        "can you draft the letter to send to him",
+    ],
+}
+
+INTENT_PRIORITY = ["document", "legal", "personal", "greeting"]
+
+# Intents matched in their own pass (their cues overlap the other intents')
+SEPARATE_PASS = ("document",)
+
+
+def compile_alternation(keywords):
+    """Single word-bounded alternation with one named group per intent."""
+    groups = "|".join(
+        f"(?P<{intent}>{'|'.join(f'(?:{p})' for p in patterns)})"
+        for intent, patterns in keywords.items()
+    )
+    return re.compile(rf"\b(?:{groups})\b")
+
+
+class Route:
+    """Result of routing one message."""
+
+    __slots__ = ("intents", "matches", "method", "domains")
+
+    def __init__(self, intents, matches=(), method="keyword", domains=()):
+        self.intents = frozenset(intents)
+        self.matches = tuple(matches)
+        self.method = method
+        self.domains = tuple(domains)     # () → search every partition
+
+    @property
+    def primary(self):
+        for intent in INTENT_PRIORITY:
+            if intent in self.intents:
+                return intent
+        return "chat"
+
+    @property
+    def is_legal(self):
+        return "legal" in self.intents
+
+    @property
+    def is_personal(self):
+        return "personal" in self.intents
+
+    def __repr__(self):
+        return (f"Route(primary={self.primary!r}, intents={sorted(self.intents)}, "
+                f"method={self.method!r}, domains={list(self.domains)})")
+
+
+class CentroidClassifier:
+    """Nearest-centroid intent classifier over (cached) query embeddings."""
+
+    def __init__(self, embeddings, exemplars=INTENT_EXEMPLARS, min_similarity=0.35):
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+        self.labels = list(exemplars)
+
+        centroids = []
+        for label in self.labels:
+            vecs = np.asarray(embeddings.embed_documents(exemplars[label]), dtype=np.float32)
+            vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+            c = vecs.mean(axis=0)
+            centroids.append(c / np.linalg.norm(c))
+        self.centroids = np.stack(centroids)   # (n_intents, dim)
+
+    def classify(self, text):
+        return self._nearest(self.embeddings.embed_query(text))
+
+    async def aclassify(self, text):
+        return self._nearest(await self.embeddings.aembed_query(text))
+
+    def _nearest(self, vector):
+        vec = np.asarray(vector, dtype=np.float32)
+        sims = self.centroids @ (vec / (np.linalg.norm(vec) or 1.0))
+        best = int(np.argmax(sims))
+        if sims[best] < self.min_similarity:
+            return None
+        return self.labels[best]
+
+
+class IntentRouter:
+
+    def __init__(self, embeddings=None, keywords=INTENT_KEYWORDS):
+        separate = {i: p for i, p in keywords.items() if i in SEPARATE_PASS}
+        shared = {i: p for i, p in keywords.items() if i not in SEPARATE_PASS}
+        self.patterns = [compile_alternation(k) for k in (separate, shared) if k]
+        self.classifier = CentroidClassifier(embeddings) if embeddings is not None else None
+
+    def route(self, text: str) -> Route:
+        route = self._keyword_route(text)
+        if route is None and self.classifier is not None:
+            route = self._centroid_route(text, self.classifier.classify(text))
+        return route or Route((), method="none")
+
+    async def aroute(self, text: str) -> Route:
+        """Async variant of route: the embedding fallback awaits aembed_query."""
+        route = self._keyword_route(text)
+        if route is None and self.classifier is not None:
+            route = self._centroid_route(text, await self.classifier.aclassify(text))
+        return route or Route((), method="none")
+
+    def _keyword_route(self, text):
+        intents = set()
+        matches = []
+        lowered = text.lower()
+        for pattern in self.patterns:
+            for m in pattern.finditer(lowered):
+                intents.add(m.lastgroup)
+                matches.append(m.group(0))
+
+        if intents:
+            return Route(intents, matches, domains=query_domains(text))
+        return None
+
+    @staticmethod
+    def _centroid_route(text, label):
+        if label:
+            return Route({label}, method="centroid", domains=query_domains(text))
+        return None
+
+
+# Keyword-only router shared by module-level helpers
+DEFAULT_ROUTER = IntentRouter()
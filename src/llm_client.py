@@ -0,0 +1,348 @@
+# src/llm_client.py
+"""
+Process-wide LLM gateway for the local Ollama server.
+
+Every chain gets its chat model from get_chat_model(), so that:
+- there is ONE ChatOllama (one pooled keep-alive HTTP client, sync and
+  async) per model; per-chain settings (temperature, num_predict, format)
+  are sent as per-call options
+- all calls of a model use the same num_ctx (a different num_ctx makes
+  Ollama reload the model) and the same pinned keep_alive (the model stays
+  in memory between requests instead of unloading after 5 idle minutes)
+- at most LLM_MAX_CONCURRENCY generations per model run at once; waiting
+  calls are admitted by priority (voice > chat > document > background),
+  from threads and from asyncio alike
+- prompt-eval / eval token counts and durations reported by Ollama are
+  recorded per model (LLM_TIMINGS), so prefix-cache hits and cold loads
+  show up in metrics
+
+Prompts should keep their long static part (system rules, template text)
+first and the per-turn parts last: llama.cpp reuses the KV cache of the
+longest common prefix with the previous request.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable
+from langchain_ollama import ChatOllama
+
+
+load_dotenv()
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")          # None → http://localhost:11434
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "2048"))
+# Concurrent generations per model; match the server's OLLAMA_NUM_PARALLEL
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", "1")))
+
+# Admission priorities (lower is served first)
+PRIORITY_VOICE = 0
+PRIORITY_CHAT = 1
+PRIORITY_DOCUMENT = 2
+PRIORITY_BACKGROUND = 3
+
+_NS = 1e9
+
+
+def ollama_timings(metadata) -> dict:
+    """Token counts and seconds from an Ollama response_metadata dict."""
+    if not metadata or "eval_count" not in metadata:
+        return {}
+    return {
+        "prompt_eval_tokens": metadata.get("prompt_eval_count", 0) or 0,
+        "prompt_eval_s": (metadata.get("prompt_eval_duration", 0) or 0) / _NS,
+        "eval_tokens": metadata.get("eval_count", 0) or 0,
+        "eval_s": (metadata.get("eval_duration", 0) or 0) / _NS,
+        "load_s": (metadata.get("load_duration", 0) or 0) / _NS,
+    }
+
+
+class LLMTimings(BaseCallbackHandler):
+    """Aggregates Ollama's timing fields per model (sync, async and streaming calls)."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for gen in generations:
+                message = getattr(gen, "message", None)
+                metadata = message.response_metadata if message is not None else gen.generation_info
+                self.record(metadata)
+
+    def record(self, metadata):
+        timings = ollama_timings(metadata)
+        if not timings:
+            return
+        model = metadata.get("model", "unknown")
+        with self._lock:
+            s = self._stats.setdefault(model, {
+                "calls": 0, "cold_loads": 0,
+                "prompt_eval_tokens": 0, "prompt_eval_s": 0.0,
+                "eval_tokens": 0, "eval_s": 0.0, "load_s": 0.0,
+            })
+            s["calls"] += 1
+            # A load over a second means the model was not resident
+            s["cold_loads"] += timings["load_s"] > 1.0
+            for key, value in timings.items():
+                s[key] += value
+
+    def stats(self):
+        with self._lock:
+            out = {}
+            for model, s in self._stats.items():
+                out[model] = {
+                    **s,
+                    "prompt_tokens_per_s": s["prompt_eval_tokens"] / s["prompt_eval_s"] if s["prompt_eval_s"] else None,
+                    "eval_tokens_per_s": s["eval_tokens"] / s["eval_s"] if s["eval_s"] else None,
+                }
+            return out
+
+
+LLM_TIMINGS = LLMTimings()
+
+
+# ---------------------------------------------------------
+# Priority admission
+# ---------------------------------------------------------
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, event=None, loop=None, future=None):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class PrioritySemaphore:
+    """
+    Counting semaphore whose waiters are served lowest priority first (FIFO
+    within a priority). Threads use acquire()/slot(), coroutines
+    aacquire()/aslot(); both kinds wait in the same queue.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._available = limit
+        self._waiters = []          # heap of (priority, seq, _Waiter)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "waited": 0, "wait_s": 0.0}
+
+    def _try_acquire(self):
+        # Caller holds self._lock; permits are only free when nobody waits
+        if self._available:
+            self._available -= 1
+            self.stats["acquired"] += 1
+            return True
+        return False
+
+    def _record_wait(self, start):
+        with self._lock:
+            self.stats["acquired"] += 1
+            self.stats["waited"] += 1
+            self.stats["wait_s"] += time.perf_counter() - start
+
+    def acquire(self, priority: int = PRIORITY_CHAT):
+        with self._lock:
+            if self._try_acquire():
+                return
+            waiter = _Waiter(event=threading.Event())
+            heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+
+        start = time.perf_counter()
+        waiter.event.wait()
+        self._record_wait(start)
+
+    async def aacquire(self, priority: int = PRIORITY_CHAT):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire():
+                return
+            waiter = _Waiter(loop=loop, future=loop.create_future())
+            entry = (priority, next(self._seq), waiter)
+            heapq.heappush(self._waiters, entry)
+
+        start = time.perf_counter()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+            if granted:
+                # The permit was handed over as we were cancelled: pass it on
+                self.release()
+            raise
+        self._record_wait(start)
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                waiter.granted = True
+                if waiter.event is not None:
+                    waiter.event.set()
+                    return
+                try:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                    return
+                except RuntimeError:
+                    continue        # its event loop is closed; try the next one
+            self._available += 1
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_CHAT):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, priority: int = PRIORITY_CHAT):
+        await self.aacquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @property
+    def active(self):
+        return self.limit - self._available
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+
+# ---------------------------------------------------------
+# Gateway clients
+# ---------------------------------------------------------
+class GatewayLLM(Runnable):
+    """
+    Chat model handle of one chain: the model's shared ChatOllama plus this
+    chain's options and admission priority. Supports invoke / ainvoke /
+    stream / astream / bind and composes with `|` like any Runnable.
+    """
+
+    def __init__(self, base, semaphore, options, priority=PRIORITY_CHAT, call_kwargs=None):
+        self.base = base
+        self.semaphore = semaphore
+        self.options = options
+        self.priority = priority
+        self.call_kwargs = call_kwargs or {}
+
+    @property
+    def model(self):
+        return self.base.model
+
+    def bind(self, **kwargs):
+        return GatewayLLM(self.base, self.semaphore, self.options, self.priority, {**self.call_kwargs, **kwargs})
+
+    def with_priority(self, priority: int):
+        return GatewayLLM(self.base, self.semaphore, self.options, priority, self.call_kwargs)
+
+    def _kwargs(self, kwargs):
+        return {"options": self.options, **self.call_kwargs, **kwargs}
+
+    def invoke(self, input, config=None, **kwargs):
+        with self.semaphore.slot(self.priority):
+            return self.base.invoke(input, config, **self._kwargs(kwargs))
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        async with self.semaphore.aslot(self.priority):
+            return await self.base.ainvoke(input, config, **self._kwargs(kwargs))
+
+    def stream(self, input, config=None, **kwargs):
+        # The slot is held until the stream is exhausted or closed
+        with self.semaphore.slot(self.priority):
+            yield from self.base.stream(input, config, **self._kwargs(kwargs))
+
+    async def astream(self, input, config=None, **kwargs):
+        async with self.semaphore.aslot(self.priority):
+            async for chunk in self.base.astream(input, config, **self._kwargs(kwargs)):
+                yield chunk
+
+
+class LLMGateway:
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._models = {}           # model → (ChatOllama, PrioritySemaphore)
+        self._lock = threading.Lock()
+
+    def _model(self, model):
+        with self._lock:
+            entry = self._models.get(model)
+            if entry is None:
+                base = ChatOllama(
+                    model=model,
+                    num_ctx=OLLAMA_NUM_CTX,
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                    base_url=OLLAMA_BASE_URL,
+                    callbacks=[LLM_TIMINGS],
+                )
+                entry = self._models[model] = (base, PrioritySemaphore(self.max_concurrency))
+            return entry
+
+    def client(self, model="llama2", temperature=0.2, num_predict=None, format=None, priority=PRIORITY_CHAT):
+        base, semaphore = self._model(model)
+        options = {"num_ctx": OLLAMA_NUM_CTX, "temperature": temperature}
+        if num_predict is not None:
+            options["num_predict"] = num_predict
+        call_kwargs = {"format": format} if format else None
+        return GatewayLLM(base, semaphore, options, priority, call_kwargs)
+
+    def stats(self):
+        with self._lock:
+            models = dict(self._models)
+        return {
+            model: {"active": sem.active, "queued": sem.queued, **sem.stats}
+            for model, (_, sem) in models.items()
+        }
+
+
+GATEWAY = LLMGateway()
+
+
+def get_chat_model(model: str = "llama2", temperature: float = 0.2, num_predict: int = None,
+                   format: str = None, priority: int = PRIORITY_CHAT):
+    """Chat model routed through the process-wide gateway (shared client + admission)."""
+    return GATEWAY.client(model, temperature, num_predict, format, priority)
+
+
+def warm_up(model: str = "llama2", system_prompt: str = None):
+    """
+    Load `model` into Ollama and prefill `system_prompt`, so the first user
+    request neither waits for the model load nor re-evaluates the static prefix.
+    """
+    messages = [("system", system_prompt)] if system_prompt else []
+    messages.append(("user", "hi"))
+    try:
+        response = get_chat_model(model, num_predict=1, priority=PRIORITY_VOICE).invoke(messages)
+    except Exception as e:
+        print(f"⚠️ Could not warm up '{model}': {e}")
+        return None
+    timings = ollama_timings(response.response_metadata)
+    print(f"🔥 Model '{model}' warm (load {timings.get('load_s', 0):.1f}s)")
+    return timings
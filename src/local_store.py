@@ -0,0 +1,328 @@
+# src/local_store.py
+"""
+Offline vector store: drop-in replacement for Pinecone (VECTOR_BACKEND=local).
+
+Index directory layout:
+- vectors.npy   : (n, dim) unit vectors, float32 or float16, memory-mapped on load
+- chunks.jsonl  : one {"id", "text", "metadata"} line per row of vectors.npy
+- index.json    : dim / dtype / count / version
+- hnsw.bin      : optional HNSW graph (needs `hnswlib`) for sub-millisecond top-k
+
+Exact (flat) search is a blocked matrix-vector product over the memmap, so
+even float16 corpora larger than RAM can be searched. A filter on the
+domain partition alone (src/domains.py) only scores that partition's rows.
+"""
+
+import os
+import json
+import uuid
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from src.domains import DEFAULT_DOMAIN
+
+try:
+    import hnswlib
+except ImportError:  # HNSW is optional; flat search is always available
+    hnswlib = None
+
+
+DEFAULT_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "vector_index")
+FLAT_BLOCK_ROWS = 65536
+PARTITION_KEY = "domain"
+
+
+def matches_filter(metadata, filter):
+    """Pinecone-style equality filter: {"key": value} or {"key": {"$in": [...]}}."""
+    for key, expected in filter.items():
+        value = metadata.get(key)
+        if isinstance(expected, dict) and "$in" in expected:
+            if value not in expected["$in"]:
+                return False
+        elif isinstance(expected, dict) and "$eq" in expected:
+            if value != expected["$eq"]:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+
+    def __init__(
+        self,
+        embedding,
+        index_dir: str = DEFAULT_INDEX_DIR,
+        dtype: str = None,
+        use_hnsw: bool = None,
+    ):
+        self._embedding = embedding
+        self.index_dir = index_dir
+        self.dtype = np.dtype(dtype or os.getenv("LOCAL_INDEX_DTYPE", "float32"))
+        if use_hnsw is None:
+            use_hnsw = os.getenv("LOCAL_INDEX_HNSW", "1") != "0"
+        self.use_hnsw = use_hnsw and hnswlib is not None
+
+        self.version = 0
+        self._vectors = None     # np.ndarray or np.memmap, rows are unit vectors
+        self._chunks = []        # row → {"id", "text", "metadata"}
+        self._rows = {}          # id → row
+        self._deleted = set()    # rows removed since the last save()
+        self._partitions = None  # domain → sorted rows, built on first filtered search
+        self._hnsw = None
+        self._lock = threading.RLock()
+
+        if os.path.exists(os.path.join(index_dir, "index.json")):
+            self.load()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return len(self._chunks) - len(self._deleted)
+
+    # ---------------------------------------------------------
+    # Load / save
+    # ---------------------------------------------------------
+    def load(self):
+        with open(os.path.join(self.index_dir, "index.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+
+        vectors = np.load(os.path.join(self.index_dir, "vectors.npy"), mmap_mode="r")
+        chunks = []
+        with open(os.path.join(self.index_dir, "chunks.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                chunks.append(json.loads(line))
+
+        hnsw = None
+        hnsw_path = os.path.join(self.index_dir, "hnsw.bin")
+        if self.use_hnsw and os.path.exists(hnsw_path) and len(chunks):
+            hnsw = hnswlib.Index(space="cosine", dim=info["dim"])
+            hnsw.load_index(hnsw_path, max_elements=len(chunks))
+            hnsw.set_ef(int(os.getenv("HNSW_EF", "64")))
+
+        with self._lock:
+            self.version = info.get("version", 0)
+            self.dtype = vectors.dtype
+            self._vectors = vectors
+            self._chunks = chunks
+            self._rows = {c["id"]: i for i, c in enumerate(chunks)}
+            self._deleted = set()
+            self._partitions = None
+            self._hnsw = hnsw
+
+        print(f"📂 Local vector index loaded: {len(chunks)} chunks from {self.index_dir}"
+              f"{' (HNSW)' if hnsw else ''}")
+
+    def save(self):
+        """Compact deleted rows, write files atomically and rebuild HNSW."""
+        with self._lock:
+            live = [i for i in range(len(self._chunks)) if i not in self._deleted]
+            chunks = [self._chunks[i] for i in live]
+            if self._vectors is None:
+                vectors = np.zeros((0, 0), dtype=self.dtype)
+            else:
+                vectors = np.asarray(self._vectors[live], dtype=self.dtype)
+
+            os.makedirs(self.index_dir, exist_ok=True)
+            self.version += 1
+
+            self._write(
+                "vectors.npy",
+                lambda f: np.save(f, vectors),
+                binary=True
+            )
+            self._write(
+                "chunks.jsonl",
+                lambda f: f.writelines(json.dumps(c, ensure_ascii=False) + "\n" for c in chunks)
+            )
+
+            hnsw_path = os.path.join(self.index_dir, "hnsw.bin")
+            if self.use_hnsw and len(chunks):
+                hnsw = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+                hnsw.init_index(
+                    max_elements=len(chunks),
+                    M=int(os.getenv("HNSW_M", "16")),
+                    ef_construction=int(os.getenv("HNSW_EF_CONSTRUCTION", "200")),
+                )
+                hnsw.add_items(vectors.astype(np.float32), np.arange(len(chunks)))
+                hnsw.save_index(hnsw_path + ".tmp")
+                os.replace(hnsw_path + ".tmp", hnsw_path)
+            elif os.path.exists(hnsw_path):
+                os.remove(hnsw_path)
+
+            self._write("index.json", lambda f: json.dump({
+                "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                "dtype": str(vectors.dtype),
+                "count": len(chunks),
+                "version": self.version,
+            }, f, indent=2))
+
+        self.load()
+
+    def _write(self, name, writer, binary=False):
+        path = os.path.join(self.index_dir, name)
+        with open(path + ".tmp", "wb" if binary else "w", encoding=None if binary else "utf-8") as f:
+            writer(f)
+        os.replace(path + ".tmp", path)
+
+    # ---------------------------------------------------------
+    # Writes (kept in memory until save())
+    # ---------------------------------------------------------
+    def add_texts(self, texts, metadatas=None, ids=None, embeddings=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        # Row-count ids would collide with live ids once save() compacts deleted rows
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        if embeddings is None:
+            embeddings = self._embedding.embed_documents(texts)
+
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32)).astype(self.dtype)
+
+        with self._lock:
+            # Re-adding an id replaces the old row
+            self.delete([i for i in ids if i in self._rows])
+
+            start = len(self._chunks)
+            if self._vectors is None or not len(self._chunks):
+                self._vectors = vectors
+            else:
+                self._vectors = np.concatenate([np.asarray(self._vectors), vectors])
+
+            for offset, (cid, text, meta) in enumerate(zip(ids, texts, metadatas)):
+                self._chunks.append({"id": cid, "text": text, "metadata": meta})
+                self._rows[cid] = start + offset
+
+            # The on-disk graph no longer covers every row
+            self._hnsw = None
+            self._partitions = None
+
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        with self._lock:
+            for cid in ids or []:
+                row = self._rows.pop(cid, None)
+                if row is not None:
+                    self._deleted.add(row)
+        return True
+
+    def get_by_ids(self, ids):
+        return [self._to_document(self._rows[i], None) for i in ids if i in self._rows]
+
+    def get_vectors(self, ids):
+        """Stored unit vectors of `ids` (float32, one row per id; all ids must exist)."""
+        with self._lock:
+            rows = [self._rows[i] for i in ids]
+            return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    # ---------------------------------------------------------
+    # Search
+    # ---------------------------------------------------------
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        vector = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(vector, k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None):
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+
+        with self._lock:
+            if not len(self):
+                return []
+
+            if self._hnsw is not None and not filter and not self._deleted:
+                labels, distances = self._hnsw.knn_query(query, k=min(k, len(self._chunks)))
+                hits = [(int(r), 1.0 - float(d)) for r, d in zip(labels[0], distances[0])]
+            else:
+                hits = self._flat_search(query, k, filter)
+
+            return [(self._to_document(row, score), score) for row, score in hits]
+
+    def _flat_search(self, query, k, filter):
+        if filter and set(filter) == {PARTITION_KEY}:
+            return self._partition_search(query, k, filter[PARTITION_KEY])
+
+        n = len(self._chunks)
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, FLAT_BLOCK_ROWS):
+            block = np.asarray(self._vectors[start:start + FLAT_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+
+        if self._deleted:
+            scores[list(self._deleted)] = -np.inf
+        if filter:
+            for row, chunk in enumerate(self._chunks):
+                if not matches_filter(chunk["metadata"], filter):
+                    scores[row] = -np.inf
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(r), float(scores[r])) for r in top if np.isfinite(scores[r])]
+
+    def _partition_rows(self, expected):
+        if self._partitions is None:
+            groups = {}
+            for row, chunk in enumerate(self._chunks):
+                groups.setdefault(chunk["metadata"].get(PARTITION_KEY, DEFAULT_DOMAIN), []).append(row)
+            self._partitions = {d: np.asarray(rows, dtype=np.int64) for d, rows in groups.items()}
+
+        if isinstance(expected, dict):
+            values = expected.get("$in", [expected.get("$eq")])
+        else:
+            values = [expected]
+        parts = [self._partitions[v] for v in values if v in self._partitions]
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def _partition_search(self, query, k, expected):
+        """Flat search over the rows of one or a few domain partitions."""
+        rows = self._partition_rows(expected)
+        if self._deleted:
+            rows = rows[~np.isin(rows, list(self._deleted))]
+        if not len(rows):
+            return []
+
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), FLAT_BLOCK_ROWS):
+            block = np.asarray(self._vectors[rows[start:start + FLAT_BLOCK_ROWS]], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def _to_document(self, row, score):
+        chunk = self._chunks[row]
+        metadata = dict(chunk["metadata"])
+        if score is not None:
+            metadata["score"] = score
+        return Document(page_content=chunk["text"], metadata=metadata, id=chunk["id"])
+
+    @staticmethod
+    def _normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    # ---------------------------------------------------------
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, index_dir=DEFAULT_INDEX_DIR, **kwargs):
+        store = cls(embedding, index_dir=index_dir, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        store.save()
+        return store
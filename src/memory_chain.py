@@ -116,22 +116,137 @@
 
 import re
 import json
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_ollama import ChatOllama
+import asyncio
+import threading
+from concurrent.futures import wait
+
+import numpy as np
+
+from src.history_store import BoundedHistory
+from src.llm_client import get_chat_model, PRIORITY_BACKGROUND
+
+
+# -------------------------------------------------------------------
+# Fact gate: skip the extraction LLM for messages with no personal fact
+# -------------------------------------------------------------------
+FIRST_PERSON_RE = re.compile(r"\b(?:i|i'm|im|my|me|mine|myself|we|our)\b")
+
+# Declarative first-person statements ("my X is ...", "i work ...")
+FACT_STATEMENT_RE = re.compile(
+    r"\b(?:my (?:\w+ ){0,2}(?:is|are|was|were|lives|works|died|has|had)"
+    r"|i(?: am|'m| was| work| worked| live| lived| stay| study| studied| have| had"
+    r"| own| rent| earn| got| was born| belong| moved))\b"
+)
+
+QUESTION_START_RE = re.compile(
+    r"^(?:what|who|where|when|why|how|which|is|are|can|could|should|do|does|will|would)\b"
+)
+
+FACT_EXEMPLARS = [
+    "my father's name is Suresh",
+    "I work at a garment factory",
+    "my landlord is Mr. Rao",
+    "I studied at RV college",
+    "my wife and I have two children",
+    "I have been renting this house for five years",
+    "my employer is ABC constructions",
+    "I was born in 1985",
+]
+
+
+class FactGate:
+    """
+    Cheap pre-classifier in front of the extraction LLM:
+    1. lexical: no first-person word → no personal fact; a declarative
+       first-person statement → likely a fact
+    2. semantic (optional): ambiguous first-person text is compared to
+       FACT_EXEMPLARS with cached MiniLM embeddings
+    """
+
+    def __init__(self, embeddings=None, threshold: float = 0.5):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self._exemplars = None
+        self.stats = {"checked": 0, "passed": 0, "skipped_lexical": 0, "skipped_semantic": 0}
+
+    def may_contain_fact(self, text: str) -> bool:
+        text = text.lower().strip()
+        verdict = self._classify_lexical(text)
+        if verdict is None:
+            verdict = self._semantic_verdict(self._exemplar_matrix(), self.embeddings.embed_query(text))
+        return self._count(verdict)
+
+    async def amay_contain_fact(self, text: str) -> bool:
+        """Async variant of may_contain_fact (the embedding never blocks the loop)."""
+        text = text.lower().strip()
+        verdict = self._classify_lexical(text)
+        if verdict is None:
+            exemplars = self._exemplars
+            if exemplars is None:
+                exemplars = await asyncio.to_thread(self._exemplar_matrix)
+            verdict = self._semantic_verdict(exemplars, await self.embeddings.aembed_query(text))
+        return self._count(verdict)
+
+    def _count(self, verdict):
+        passed, reason = verdict
+        self.stats["checked"] += 1
+        self.stats["passed" if passed else reason] += 1
+        return passed
+
+    def _classify_lexical(self, text):
+        """(passed, skip reason), or None when the semantic check must decide."""
+        if not FIRST_PERSON_RE.search(text):
+            return False, "skipped_lexical"
+
+        if FACT_STATEMENT_RE.search(text):
+            return True, None
+
+        # First person but phrased as a question ("what can I do ...?")
+        if QUESTION_START_RE.match(text) and text.endswith("?"):
+            return False, "skipped_lexical"
+
+        if self.embeddings is None:
+            return True, None
+        return None
+
+    def _exemplar_matrix(self):
+        if self._exemplars is None:
+            vecs = np.asarray(self.embeddings.embed_documents(FACT_EXEMPLARS), dtype=np.float32)
+            self._exemplars = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+        return self._exemplars
+
+    def _semantic_verdict(self, exemplars, vector):
+        vec = np.asarray(vector, dtype=np.float32)
+        similarity = float(np.max(exemplars @ (vec / (np.linalg.norm(vec) or 1.0))))
+        if similarity >= self.threshold:
+            return True, None
+        return False, "skipped_semantic"
 
 
 class MemoryChatbot:
     """
     Hybrid memory:
     - Regex-based extraction for known common facts
-    - LLM-based extraction for all other arbitrary facts
+    - LLM-based extraction for all other arbitrary facts, run inline or on a
+      shared FactExtractionWorker (src/fact_worker.py) off the chat path
     """
 
-    def __init__(self):
-        self.history = ChatMessageHistory()
+    def __init__(self, llm=None, fact_worker=None, fact_gate=None):
         self.memory_store = {}  # fully flexible key-value memory
-        self.llm = ChatOllama(model="llama2", temperature=0)
+        # Extraction LLM can be shared between sessions (it holds no state);
+        # extraction and history summaries yield to interactive generations
+        self.llm = llm or get_chat_model("llama2", temperature=0, priority=PRIORITY_BACKGROUND)
+        # Last few turns + rolling summary of everything older
+        self.history = BoundedHistory(summarizer=self._summarize_turns)
+        self.fact_worker = fact_worker
+        self.fact_gate = fact_gate or FactGate()
+
+        # Every user message gets a sequence number; a fact only overwrites
+        # one extracted from an older (or the same) message.
+        self.fact_versions = {}
+        self._message_seq = 0
+        self._pending = set()
+        self._lock = threading.Lock()
 
         # Known patterns → stored directly
         self.regex_patterns = {
@@ -139,8 +254,8 @@ class MemoryChatbot:
                 r"my name is ([a-zA-Z ]+)",
             ],
             "location": [
-                r"i live in ([a-zA-Z ]]+)",
-                r"i am from ([a-zA-Z ]]+)",
+                r"i live in ([a-zA-Z ]+)",
+                r"i am from ([a-zA-Z ]+)",
             ],
             "age": [
                 r"i am (\d{1,2}) years old",
@@ -157,24 +272,65 @@ class MemoryChatbot:
                 r"my email is ([^\s@]+@[^\s@]+)"
             ]
         }
+        self._compile_patterns()
+
+    def _compile_patterns(self):
+        """
+        Precompile every pattern, keeping the priority order of
+        regex_patterns: the first field (then pattern) that matches anywhere
+        in the message wins, not the leftmost match in the text.
+        """
+        self._fact_regexes = [
+            (field, re.compile(pattern))
+            for field, patterns in self.regex_patterns.items()
+            for pattern in patterns
+        ]
 
 
     # -------------------------------------------------------------------
     # Main interface
     # -------------------------------------------------------------------
     def add_user_message(self, text: str):
-        self.history.add_message(HumanMessage(content=text))
-        self._extract_facts(text)
+        self.history.add_user_message(text)
+        self._extract_facts(text, self._next_version())
+
+
+    async def aadd_user_message(self, text: str):
+        """Async variant of add_user_message (LLM fallback uses ainvoke)."""
+        self.history.add_user_message(text)
+        await self._aextract_facts(text, self._next_version())
+
+
+    def wait_for_pending_facts(self, timeout: float = None):
+        """Block until background extractions of this session have finished."""
+        pending = list(self._pending)
+        if pending:
+            wait(pending, timeout=timeout)
+
+
+    async def await_pending_facts(self, timeout: float = None):
+        """Async variant of wait_for_pending_facts."""
+        pending = [asyncio.wrap_future(f) for f in list(self._pending)]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
 
 
     def add_assistant_response(self, text: str):
-        self.history.add_message(AIMessage(content=text))
+        self.history.add_ai_message(text)
 
 
     def get_fact(self, key: str):
         return self.memory_store.get(key)
 
 
+    def reset(self):
+        """Forget the conversation and every stored fact."""
+        self.history.clear()
+        with self._lock:
+            self.memory_store = {}
+            self.fact_versions = {}
+
+
     def get_memory_string(self):
         if not self.memory_store:
             return "None"
@@ -183,42 +339,106 @@ class MemoryChatbot:
     def get_history(self):
         """
         Return the raw list of chat message objects (compatible with older code).
-        Each item has .type and .content attributes.
+        Each item has .type and .content attributes. Only the recent window is
+        kept; older turns are in self.history.summary.
         """
         return self.history.messages
 
+
+    def _summarize_turns(self, summary: str, lines: list, max_tokens: int):
+        """Background summarizer for BoundedHistory (one LLM call)."""
+        turns = "\n".join(lines)
+        prompt = f"""
+Update the running summary of a conversation between a user and an Indian
+legal assistant. Keep personal facts, the user's legal issues and open
+questions; drop greetings and small talk. Use at most {max_tokens * 3 // 4} words.
+
+Current summary:
+{summary or "None"}
+
+Turns to add:
+{turns}
+
+Updated summary:
+"""
+        return self.llm.invoke(prompt).content.strip()
+
     # -------------------------------------------------------------------
     # Extraction logic (Regex first → LLM fallback)
     # -------------------------------------------------------------------
-    def _extract_facts(self, text: str):
+    def _next_version(self):
+        with self._lock:
+            self._message_seq += 1
+            return self._message_seq
+
+
+    def merge_fact(self, key, value, version):
+        """Store a fact unless a newer message already set this key."""
+        with self._lock:
+            if version < self.fact_versions.get(key, 0):
+                return False
+            self.memory_store[key] = value
+            self.fact_versions[key] = version
+            return True
+
+
+    def _extract_facts_regex(self, text: str, version: int):
+        """Store the first regex match; returns True if a fact was found."""
         text_lower = text.lower()
+        for field, regex in self._fact_regexes:
+            match = regex.search(text_lower)
+            if match:
+                self.merge_fact(field, match.group(1).strip(), version)
+                return True
+        return False
 
-        # 1. Check regex patterns first
-        for field, patterns in self.regex_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text_lower)
-                if match:
-                    value = match.group(1).strip()
-                    self.memory_store[field] = value
-                    return  # stop once matched
-
-        # 2. LLM fallback: detect arbitrary facts
-        extracted = self._extract_fact_llm(text)
+
+    def _store_extracted(self, extracted: dict, version: int):
         if extracted:
             key = extracted.get("key")
             value = extracted.get("value")
             if key and value:
-                self.memory_store[key] = value
+                return self.merge_fact(key, value, version)
+        return False
 
 
-    def _extract_fact_llm(self, message: str):
-        """
-        Use LLM to extract arbitrary personal facts such as:
-        - my father's name is X
-        - my college is Y
-        - my landlord is Z
-        """
-        prompt = f"""
+    def _submit_background(self, text: str, version: int):
+        future = self.fact_worker.submit(self, text, version)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+
+    def _extract_facts(self, text: str, version: int):
+        # 1. Check regex patterns first
+        if self._extract_facts_regex(text, version):
+            return  # stop once matched
+
+        # 2. Cheap gate: most legal questions state no personal fact
+        if not self.fact_gate.may_contain_fact(text):
+            return
+
+        # 3. LLM fallback: detect arbitrary facts (off the chat path if possible)
+        if self.fact_worker is not None:
+            self._submit_background(text, version)
+        else:
+            self._store_extracted(self._extract_fact_llm(text), version)
+
+
+    async def _aextract_facts(self, text: str, version: int):
+        if self._extract_facts_regex(text, version):
+            return
+
+        if not await self.fact_gate.amay_contain_fact(text):
+            return
+
+        if self.fact_worker is not None:
+            self._submit_background(text, version)
+        else:
+            self._store_extracted(await self._aextract_fact_llm(text), version)
+
+
+    def _fact_prompt(self, message: str):
+        return f"""
 Extract ONE personal fact from this sentence only if it clearly states a fact.
 
 Return strict JSON:
@@ -234,9 +454,68 @@ Sentence:
 "{message}"
 """
 
+
+    def _extract_fact_llm(self, message: str):
+        """
+        Use LLM to extract arbitrary personal facts such as:
+        - my father's name is X
+        - my college is Y
+        - my landlord is Z
+        """
         try:
-            response = self.llm.invoke(prompt).content.strip()
+            response = self.llm.invoke(self._fact_prompt(message)).content.strip()
             data = json.loads(response)
             return data
         except:
             return {}
+
+
+    def _extract_facts_llm_batch(self, items):
+        """
+        Extract facts from several pending (text, version) messages with ONE
+        JSON-mode LLM call. Returns the number of facts stored.
+        """
+        if len(items) == 1:
+            text, version = items[0]
+            return int(self._store_extracted(self._extract_fact_llm(text), version))
+
+        numbered = "\n".join(f'{i}. "{text}"' for i, (text, _) in enumerate(items, start=1))
+        prompt = f"""
+Extract the personal facts the user clearly states about themselves in the
+numbered messages below. Ignore questions and legal topics.
+
+Return strict JSON:
+{{"facts": [{{"message": <number>, "key": "<field_name_in_snake_case>", "value": "<value>"}}]}}
+
+If no fact is present, return:
+{{"facts": []}}
+
+Messages:
+{numbered}
+"""
+        try:
+            response = self.llm.bind(format="json").invoke(prompt).content.strip()
+            facts = json.loads(response).get("facts", [])
+        except:
+            return 0
+
+        stored = 0
+        for fact in facts:
+            try:
+                index = int(fact.get("message")) - 1
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= index < len(items):
+                continue
+            _, version = items[index]
+            stored += int(self._store_extracted(fact, version))
+        return stored
+
+
+    async def _aextract_fact_llm(self, message: str):
+        """Async variant of _extract_fact_llm using ainvoke."""
+        try:
+            response = await self.llm.ainvoke(self._fact_prompt(message))
+            return json.loads(response.content.strip())
+        except:
+            return {}
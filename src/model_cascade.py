@@ -0,0 +1,85 @@
+# src/model_cascade.py
+"""
+Model cascade for CombinedLegalChatbot.
+
+Greetings, chit-chat and personal turns do not need llama2: a small
+quantized model (LLM_SMALL_MODEL, e.g. "llama3.2:1b") answers them several
+times faster. Legal answers, long answers and document drafting stay on the
+large model (LLM_LARGE_MODEL). A legal question whose best retrieved chunk
+is a near-exact match (dense score >= CASCADE_CONFIDENT_SCORE) and that
+expects a short answer may also go to the small model.
+
+Without LLM_SMALL_MODEL both tiers use the large model. Latency is
+recorded per tier.
+"""
+
+import os
+import re
+import threading
+
+
+LARGE_MODEL = os.getenv("LLM_LARGE_MODEL", "llama2")
+SMALL_MODEL = os.getenv("LLM_SMALL_MODEL")      # None: small tier = large model
+
+CONFIDENT_SCORE = float(os.getenv("CASCADE_CONFIDENT_SCORE", "0.85"))
+LONG_ANSWER_WORDS = int(os.getenv("CASCADE_LONG_QUERY_WORDS", "40"))
+
+# Questions that ask for more than a one-line reply
+LONG_ANSWER_RE = re.compile(
+    r"\b(?:explain|in detail|detailed|step[- ]by[- ]step|steps|procedure|process"
+    r"|difference between|compare|list (?:all|the)|draft|write)\b"
+)
+
+
+def expects_long_answer(query: str) -> bool:
+    return len(query.split()) > LONG_ANSWER_WORDS or bool(LONG_ANSWER_RE.search(query.lower()))
+
+
+def context_confidence(docs):
+    """Best dense similarity among retrieved chunks (None if unscored)."""
+    scores = [d.metadata["score"] for d in docs if "score" in (d.metadata or {})]
+    return max(scores) if scores else None
+
+
+class ModelCascade:
+
+    def __init__(self, tiers: dict, confident_score: float = CONFIDENT_SCORE):
+        """tiers: {"small": llm, "large": llm}"""
+        self.tiers = tiers
+        self.confident_score = confident_score
+        self._lock = threading.Lock()
+        self._stats = {name: {"calls": 0, "total_s": 0.0} for name in tiers}
+
+    def choose(self, route, docs, query):
+        """Returns (tier, reason)."""
+        if "document" in route.intents:
+            return "large", "document"
+        long_answer = expects_long_answer(query)
+        if route.is_legal:
+            confidence = context_confidence(docs)
+            if not long_answer and confidence is not None and confidence >= self.confident_score:
+                return "small", "confident_context"
+            return "large", "legal"
+        if long_answer:
+            return "large", "long_answer"
+        return "small", route.primary
+
+    def llm(self, tier):
+        return self.tiers[tier]
+
+    def record(self, tier, seconds):
+        with self._lock:
+            s = self._stats[tier]
+            s["calls"] += 1
+            s["total_s"] += seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    "model": getattr(self.tiers[name], "model", None),
+                    **s,
+                    "mean_s": s["total_s"] / s["calls"] if s["calls"] else None,
+                }
+                for name, s in self._stats.items()
+            }
@@ -0,0 +1,98 @@
+# src/personal_responder.py
+"""
+Direct answers to simple personal-fact questions.
+
+"What is my name?", "who am I", "where do I live" need no generation: the
+answer is already in MemoryChatbot.memory_store. The whole (normalized)
+message must be one lookup question — optionally wrapped in fillers like
+"hey", "can you tell me" or "please" — so compound questions ("what is my
+name and can I file an RTI?") never match and still go to the LLM.
+"""
+
+import re
+
+
+# Fact key (as stored in memory_store) → lookup questions
+PERSONAL_LOOKUPS = {
+    "name": [
+        r"what(?:'s| is) my name",
+        r"who am i",
+        r"do you (?:know|remember) my name",
+        r"(?:can you |could you )?tell me my name",
+    ],
+    "location": [
+        r"where do i (?:live|stay)",
+        r"where am i from",
+        r"what(?:'s| is) my (?:location|city|address)",
+    ],
+    "age": [
+        r"how old am i",
+        r"what(?:'s| is) my age",
+    ],
+    "occupation": [
+        r"what do i do(?: for (?:a )?living)?",
+        r"what(?:'s| is) my (?:occupation|job|profession|work)",
+    ],
+    "phone": [
+        r"what(?:'s| is) my (?:phone|mobile)(?: number)?",
+    ],
+    "email": [
+        r"what(?:'s| is) my email(?: id| address)?",
+    ],
+    "father_name": [
+        r"what(?:'s| is) my father(?:'s)? name",
+        r"who is my father",
+    ],
+    "mother_name": [
+        r"what(?:'s| is) my mother(?:'s)? name",
+        r"who is my mother",
+    ],
+}
+
+ANSWER_TEMPLATES = {
+    "name": "Your name is {value}.",
+    "location": "You live in {value}.",
+    "age": "You are {value} years old.",
+}
+DEFAULT_TEMPLATE = "Your {label} is {value}."
+# Regex extraction stores lowercase text; restore capitals for proper nouns
+TITLE_CASE_FACTS = {"name", "location", "father_name", "mother_name"}
+
+FILLER_PREFIX = r"(?:(?:hi|hey|hello|ok|okay|so|please|can you tell me|could you tell me|do you know|do you remember|tell me)[, ]+)*"
+FILLER_SUFFIX = r"(?:[, ]+(?:please|again|now))*"
+
+
+def normalize_question(text: str) -> str:
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    return text.rstrip("?!. ").replace("’", "'")
+
+
+class PersonalFactResponder:
+
+    def __init__(self, lookups=PERSONAL_LOOKUPS):
+        groups = "|".join(
+            f"(?P<{key}>{'|'.join(f'(?:{p})' for p in patterns)})"
+            for key, patterns in lookups.items()
+        )
+        self.pattern = re.compile(rf"{FILLER_PREFIX}(?:{groups}){FILLER_SUFFIX}")
+        self.stats = {"answered": 0, "missing": 0}
+
+    def match(self, text: str):
+        """Fact key asked for, or None if the message is not a single lookup."""
+        m = self.pattern.fullmatch(normalize_question(text))
+        return m.lastgroup if m else None
+
+    def format(self, key: str, value) -> str:
+        if key in TITLE_CASE_FACTS and str(value).islower():
+            value = str(value).title()
+        template = ANSWER_TEMPLATES.get(key, DEFAULT_TEMPLATE)
+        return template.format(label=key.replace("_", " "), value=value)
+
+    def answer(self, key: str, memory):
+        """Answer from `memory` (a MemoryChatbot), or None if the fact is unknown."""
+        value = memory.get_fact(key)
+        if not value:
+            self.stats["missing"] += 1
+            return None
+        self.stats["answered"] += 1
+        return self.format(key, value)
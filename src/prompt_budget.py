@@ -0,0 +1,102 @@
+# src/prompt_budget.py
+"""
+Token-budgeted prompt assembly for CombinedLegalChatbot.
+
+Prefill time on CPU llama2 grows linearly with prompt length and long chunks
+can silently overflow num_ctx, so every dynamic section gets a token budget:
+
+- memory  : known user facts (cut at the end)
+- history : rolling summary + recent turns (oldest text cut first)
+- query   : the user's message (cut at the end)
+- context : retrieved chunks, best retrieval score first; whole chunks are
+            added while they fit, the next one is truncated if enough room is
+            left. Budget left unused by the other sections flows to context.
+"""
+
+import os
+
+from src.history_store import estimate_tokens, truncate_to_tokens
+
+
+DEFAULT_BUDGETS = {
+    "memory": int(os.getenv("PROMPT_BUDGET_MEMORY", "150")),
+    "history": int(os.getenv("PROMPT_BUDGET_HISTORY", "400")),
+    "query": int(os.getenv("PROMPT_BUDGET_QUERY", "200")),
+    "context": int(os.getenv("PROMPT_BUDGET_CONTEXT", "900")),
+}
+MIN_PARTIAL_CHUNK_TOKENS = 64
+CHUNK_SEPARATOR = "\n---\n"
+
+
+def doc_score(doc):
+    """Best available relevance score of a retrieved Document (higher is better)."""
+    meta = doc.metadata or {}
+    for key in ("rrf_score", "score"):
+        if key in meta:
+            return meta[key]
+    return None
+
+
+class PromptAssembler:
+
+    def __init__(self, budgets=None, static_tokens: int = 0, count_tokens=estimate_tokens):
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.static_tokens = static_tokens     # system prompt + section headers
+        self.count_tokens = count_tokens
+
+    def assemble(self, query: str, memory: str, docs, history: str):
+        """
+        Returns (sections, report):
+        - sections: {"memory", "context", "history", "query"} strings
+        - report:   token count per section and the final prompt total
+        """
+        b = self.budgets
+
+        memory = truncate_to_tokens(memory or "None", b["memory"])
+        history = truncate_to_tokens(history or "", b["history"], keep="end")
+        query = truncate_to_tokens(query, b["query"])
+
+        tokens = {
+            "memory": self.count_tokens(memory),
+            "history": self.count_tokens(history),
+            "query": self.count_tokens(query),
+        }
+        leftover = sum(b[k] - tokens[k] for k in tokens)
+
+        context, used_chunks = self._pack_context(docs or [], b["context"] + max(leftover, 0))
+        tokens["context"] = self.count_tokens(context)
+
+        report = {
+            **{f"{k}_tokens": v for k, v in tokens.items()},
+            "chunks_used": used_chunks,
+            "chunks_retrieved": len(docs or []),
+            "prompt_tokens": self.static_tokens + sum(tokens.values()),
+        }
+        sections = {"memory": memory, "context": context, "history": history, "query": query}
+        return sections, report
+
+    def _pack_context(self, docs, budget):
+        # Rank by retrieval score; keep retriever order for unscored docs
+        ranked = sorted(
+            enumerate(docs),
+            key=lambda item: (doc_score(item[1]) is None, -(doc_score(item[1]) or 0.0), item[0])
+        )
+
+        parts = []
+        remaining = budget
+        sep_tokens = self.count_tokens(CHUNK_SEPARATOR)
+        for _, doc in ranked:
+            text = doc.page_content.strip()
+            cost = self.count_tokens(text) + (sep_tokens if parts else 0)
+            if cost <= remaining:
+                parts.append(text)
+                remaining -= cost
+            elif remaining >= MIN_PARTIAL_CHUNK_TOKENS:
+                parts.append(truncate_to_tokens(text, remaining - sep_tokens))
+                break
+            else:
+                break
+
+        if not parts:
+            return "None", 0
+        return CHUNK_SEPARATOR.join(parts), len(parts)
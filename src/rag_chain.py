@@ -3,14 +3,16 @@
 import os
 from dotenv import load_dotenv
 
-from langchain_ollama import OllamaLLM
 from langchain_core.runnables import RunnableParallel, RunnablePassthrough
 from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 
 from langchain_pinecone import PineconeVectorStore
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from pinecone import Pinecone
 
+from src.llm_client import get_chat_model
+
 
 load_dotenv()
 
@@ -29,8 +31,8 @@ class RAGChatbot:
             embedding=self.embeddings
         )
 
-        # --- LLM (Ollama) ---
-        self.llm = OllamaLLM(model="llama2")
+        # --- LLM (Ollama, through the shared gateway) ---
+        self.llm = get_chat_model("llama2")
 
         # --- Prompt ---
         self.prompt = PromptTemplate(
@@ -56,6 +58,7 @@ Answer clearly, politely, and only using the provided context.
             }
             | self.prompt
             | self.llm
+            | StrOutputParser()
         )
 
     def ask(self, query: str):
@@ -0,0 +1,389 @@
+# src/retrieval_cache.py
+"""
+Persistent retrieval cache that survives restarts.
+
+(normalized query, k, namespace) → retrieved chunks (ids, texts, metadata,
+scores), stored in a SQLite file (RETRIEVAL_CACHE_PATH) so a restarted
+api_server / voice_chat does not pay a Pinecone round-trip for every
+question it has already seen.
+
+- index-version invalidation: every entry records the index version it was
+  retrieved from (local index.json or the ingest manifest "version", plus
+  the retrieval mode); entries of another version are misses
+- TTL expiry (RETRIEVAL_CACHE_TTL seconds)
+- size-bounded: least recently used entries are evicted above
+  RETRIEVAL_CACHE_SIZE
+- bulk prewarm from a query log (one query per line, or JSONL with
+  "query" / "text"), or from the cache's own most-hit queries after a
+  re-ingest
+
+Hits only read; their access times / hit counts are written in batches.
+Async callers run every cache access in a worker thread.
+
+Limitation: the version is only as good as its source. Pinecone has no
+index version of its own, so the ingest manifest must be on the server
+(re-ingests outside `python -m src.ingest` are not seen). Without a
+version file build_retriever() leaves the cache off.
+
+Prewarm:  python -m src.retrieval_cache prewarm [--log queries.log] [--limit 1000]
+Stats:    python -m src.retrieval_cache stats
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.embeddings import normalize_query
+from src.domains import query_domains
+
+
+DEFAULT_PATH = os.getenv("RETRIEVAL_CACHE_PATH", "retrieval_cache.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key       TEXT PRIMARY KEY,
+    query     TEXT NOT NULL,
+    k         INTEGER NOT NULL,
+    namespace TEXT NOT NULL,
+    version   TEXT NOT NULL,
+    docs      TEXT NOT NULL,
+    created   REAL NOT NULL,
+    accessed  REAL NOT NULL,
+    hits      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+# ---------------------------------------------------------
+# Index version
+# ---------------------------------------------------------
+class IndexVersion:
+    """
+    Version of the index retrieval runs against, re-read when the version
+    file changes (checked at most every `check_interval` seconds).
+    - local backend: LOCAL_INDEX_DIR/index.json
+    - pinecone: the ingest manifest (INGEST_MANIFEST)
+    The retrieval mode is part of the version: switching dense / hybrid /
+    adaptive / partitioned must not serve the other mode's results.
+    """
+
+    def __init__(self, path: str = None, mode: str = None, check_interval: float = 30.0):
+        if path is None:
+            if os.getenv("VECTOR_BACKEND", "pinecone").lower() == "local":
+                path = os.path.join(os.getenv("LOCAL_INDEX_DIR", "vector_index"), "index.json")
+            else:
+                path = os.getenv("INGEST_MANIFEST", "ingest_manifest.json")
+        if mode is None:
+            mode = os.getenv("RETRIEVAL_MODE", "dense").lower()
+            if os.getenv("RETRIEVAL_PARTITIONS", "0") == "1":
+                mode += "+partitions"
+        self.path = path
+        self.mode = mode
+        self.check_interval = check_interval
+        self._value = None
+        self._mtime = None
+        self._next_check = 0.0
+
+    @property
+    def available(self):
+        """False when there is no version file to invalidate entries with."""
+        return os.path.exists(self.path)
+
+    def __call__(self):
+        now = time.monotonic()
+        if self._value is not None and now < self._next_check:
+            return self._value
+        self._next_check = now + self.check_interval
+
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if self._value is None or mtime != self._mtime:
+            version = 0
+            if mtime is not None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        version = json.load(f).get("version", 0)
+                except (OSError, ValueError):
+                    pass
+            self._mtime = mtime
+            self._value = f"{self.mode}:{version}"
+        return self._value
+
+
+# ---------------------------------------------------------
+# SQLite store
+# ---------------------------------------------------------
+def encode_docs(docs):
+    return json.dumps(
+        [{"id": d.id, "text": d.page_content, "metadata": d.metadata} for d in docs],
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def decode_docs(data):
+    return [Document(page_content=d["text"], metadata=d["metadata"], id=d["id"]) for d in json.loads(data)]
+
+
+class RetrievalCache:
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = None, max_entries: int = None):
+        self.path = path
+        self.ttl = ttl or float(os.getenv("RETRIEVAL_CACHE_TTL", str(7 * 24 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("RETRIEVAL_CACHE_SIZE", "50000"))
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0          # entries of an older index version / past their TTL
+
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._touches = {}      # key → (last access, new hits), flushed in batches
+        self.touch_batch = int(os.getenv("RETRIEVAL_CACHE_TOUCH_BATCH", "50"))
+        self._evict_every = max(1, min(100, self.max_entries // 10))
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    @staticmethod
+    def key(query: str, k: int, namespace: str = ""):
+        return f"{normalize_query(query)}\0{k}\0{namespace}"
+
+    def get(self, query: str, k: int, namespace: str, version: str):
+        """Cached Documents for this query / k / namespace at `version`, or None."""
+        key = self.key(query, k, namespace)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT docs, version, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            docs, entry_version, created = row
+            if entry_version != version or now - created > self.ttl:
+                self.misses += 1
+                self.stale += 1
+                return None
+            _, count = self._touches.get(key, (now, 0))
+            self._touches[key] = (now, count + 1)
+            if len(self._touches) >= self.touch_batch:
+                self._flush_touches()
+            self.hits += 1
+        return decode_docs(docs)
+
+    def _flush_touches(self):
+        if not self._touches:
+            return
+        self._db.executemany(
+            "UPDATE entries SET accessed = ?, hits = hits + ? WHERE key = ?",
+            [(accessed, count, key) for key, (accessed, count) in self._touches.items()],
+        )
+        self._db.commit()
+        self._touches = {}
+
+    def flush(self):
+        with self._lock:
+            self._flush_touches()
+
+    def put(self, query: str, k: int, namespace: str, version: str, docs):
+        now = time.time()
+        with self._lock:
+            # A re-put keeps the hit count, so prewarm still finds popular queries
+            self._db.execute(
+                "INSERT INTO entries (key, query, k, namespace, version, docs, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET version = excluded.version, docs = excluded.docs, "
+                "created = excluded.created, accessed = excluded.accessed",
+                (self.key(query, k, namespace), normalize_query(query), k, namespace, version,
+                 encode_docs(docs), now, now),
+            )
+            self._db.commit()
+            self._puts += 1
+            if self._puts % self._evict_every == 0:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used ones above max_entries."""
+        self._flush_touches()
+        self._db.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+        count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            # Evict down to 90% so this does not run on every put
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (count - int(self.max_entries * 0.9),),
+            )
+        self._db.commit()
+
+    def evict(self):
+        with self._lock:
+            self._evict()
+
+    def popular_queries(self, limit: int = 1000):
+        """(query, k, namespace) of the most hit entries, any version."""
+        with self._lock:
+            self._flush_touches()
+            return self._db.execute(
+                "SELECT query, k, namespace FROM entries ORDER BY hits DESC, accessed DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def stats(self):
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": size,
+            "capacity": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._db.close()
+
+
+# ---------------------------------------------------------
+# Retriever wrapper
+# ---------------------------------------------------------
+class CachedRetriever(BaseRetriever):
+    """
+    Serves `retriever` results from a RetrievalCache. With a partitioned
+    retriever the namespace of an entry is the set of domain partitions
+    searched (see PartitionedRetriever); "" means the whole corpus.
+    """
+
+    retriever: BaseRetriever
+    cache: Any                      # RetrievalCache
+    version: Callable[[], str]      # IndexVersion
+    k: int = 5
+    partitioned: bool = False
+
+    def namespace(self, domains=None):
+        return ",".join(domains or ()) if self.partitioned else ""
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, domains=None) -> List[Document]:
+        namespace, version = self.namespace(domains), self.version()
+        docs = self.cache.get(query, self.k, namespace, version)
+        if docs is None:
+            docs = self.retriever.invoke(query, **self._kwargs(domains))
+            self.cache.put(query, self.k, namespace, version, docs)
+        return docs
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None, domains=None) -> List[Document]:
+        # Version check and SQLite access are disk I/O: keep them off the event loop
+        namespace = self.namespace(domains)
+        version, docs = await asyncio.to_thread(self._lookup, query, namespace)
+        if docs is None:
+            docs = await self.retriever.ainvoke(query, **self._kwargs(domains))
+            await asyncio.to_thread(self.cache.put, query, self.k, namespace, version, docs)
+        return docs
+
+    def _lookup(self, query, namespace):
+        version = self.version()
+        return version, self.cache.get(query, self.k, namespace, version)
+
+    @staticmethod
+    def _kwargs(domains):
+        return {"domains": domains} if domains else {}
+
+    def prewarm(self, queries, max_concurrency: int = 8):
+        """
+        Retrieve every query not cached at the current version.
+        `queries` are strings or (query, namespace) pairs.
+        Returns the number of queries retrieved.
+        """
+        version = self.version()
+        todo = []
+        for item in queries:
+            query, namespace = item if isinstance(item, tuple) else (item, None)
+            if namespace is None:
+                namespace = self.namespace(query_domains(query))
+            if self.cache.get(query, self.k, namespace, version) is None:
+                todo.append((query, namespace))
+
+        def fetch(item):
+            query, namespace = item
+            domains = tuple(namespace.split(",")) if namespace else None
+            self.cache.put(query, self.k, namespace, version,
+                           self.retriever.invoke(query, **self._kwargs(domains)))
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            list(pool.map(fetch, todo))
+        return len(todo)
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def read_query_log(path):
+    """One query per line, or JSONL records with "query" / "text"."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                line = record.get("query") or record.get("text") or ""
+            if line:
+                queries.append(line)
+    return queries
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Prewarm or inspect the persistent retrieval cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    prewarm = sub.add_parser("prewarm", help="retrieve queries not cached at the current index version")
+    prewarm.add_argument("--log", help="query log (default: the cache's most hit queries)")
+    prewarm.add_argument("--limit", type=int, default=1000)
+    prewarm.add_argument("--concurrency", type=int, default=8)
+    sub.add_parser("stats", help="print cache statistics")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(RetrievalCache().stats(), indent=2))
+        return
+
+    from src.retriever import build_retriever
+    retriever = build_retriever(5)
+    if not isinstance(retriever, CachedRetriever):
+        raise ValueError("❌ RETRIEVAL_CACHE=0: nothing to prewarm")
+
+    if args.log:
+        queries = read_query_log(args.log)[:args.limit]
+    else:
+        queries = [(q, ns) for q, k, ns in retriever.cache.popular_queries(args.limit) if k == retriever.k]
+
+    start = time.perf_counter()
+    fetched = retriever.prewarm(queries, max_concurrency=args.concurrency)
+    print(f"✅ Prewarmed {fetched} of {len(queries)} queries in {time.perf_counter() - start:.1f}s "
+          f"(version {retriever.version()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,21 +4,31 @@ Retriever module for LangChain-based Legal Aid System.
 Uses:
 - Pinecone v5/v7 client
 - langchain-pinecone wrapper
+- or a fully offline local index (VECTOR_BACKEND=local, see src/local_store.py)
+- optionally split into legal-domain partitions (RETRIEVAL_PARTITIONS=1,
+  see src/domains.py)
 """
 
 import os
-from dotenv import load_dotenv
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 
-from pinecone import Pinecone
-from langchain_pinecone import PineconeVectorStore
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 
 from src.embeddings import load_embedding_model
+from src.domains import DOMAINS
 
 
 # ---------------------------------------------------------
 # Initialize Pinecone client
 # ---------------------------------------------------------
 def init_pinecone():
+    # Imported here so the local backend runs without the Pinecone packages
+    from pinecone import Pinecone
+
     load_dotenv()
 
     api_key = os.getenv("PINECONE_API_KEY")
@@ -48,28 +58,337 @@ def init_pinecone():
 # ---------------------------------------------------------
 # Build LangChain Retriever
 # ---------------------------------------------------------
-def build_retriever(top_k: int = 5):
+def build_vectorstore(embeddings=None, backend: str = None, namespace: str = None, index=None):
     """
-    Creates a LangChain retriever using:
-    - local embeddings
-    - Pinecone vector index
-    - cosine similarity search
+    Vector store selected by VECTOR_BACKEND:
+    - "pinecone" (default): remote Pinecone index (`namespace` selects a
+      partition; pass `index` to reuse one connection)
+    - "local": memory-mapped local index in LOCAL_INDEX_DIR (no network needed)
     """
+    load_dotenv()
+    embeddings = embeddings or load_embedding_model()
+    backend = (backend or os.getenv("VECTOR_BACKEND", "pinecone")).lower()
 
-    embeddings = load_embedding_model()
-    index = init_pinecone()
+    if backend == "local":
+        from src.local_store import LocalVectorStore
+        return LocalVectorStore(embeddings)
+
+    if backend != "pinecone":
+        raise ValueError(f"❌ Unknown VECTOR_BACKEND '{backend}' (use 'pinecone' or 'local')")
+
+    from langchain_pinecone import PineconeVectorStore
+
+    index = index or init_pinecone()
 
     # langchain-pinecone wrapper
-    vectorstore = PineconeVectorStore(
+    return PineconeVectorStore(
         index=index,
         embedding=embeddings,
         text_key="text",      # must match metadata key you used during upsert
-        namespace=None        # set if you used namespace
+        namespace=namespace   # domain partition (ingested with --namespaces)
     )
 
-    retriever = vectorstore.as_retriever(
-        search_kwargs={"k": top_k}
+
+# ---------------------------------------------------------
+# Hybrid retrieval: dense + BM25 with reciprocal-rank fusion
+# ---------------------------------------------------------
+def reciprocal_rank_fusion(result_lists, k: int, rrf_k: int = 60):
+    """
+    Fuse ranked Document lists: score(d) = Σ 1 / (rrf_k + rank).
+    Documents are matched by id (falling back to their text).
+    """
+    scores = {}
+    docs = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            if key in docs:
+                docs[key].metadata.update(doc.metadata)
+            else:
+                docs[key] = Document(page_content=doc.page_content, metadata=dict(doc.metadata), id=doc.id)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    for key in ranked:
+        docs[key].metadata["rrf_score"] = scores[key]
+    return [docs[key] for key in ranked]
+
+
+class ScoredRetriever(BaseRetriever):
+    """
+    Vector store retriever that keeps the similarity score on each Document
+    (metadata["score"]), so prompt assembly can rank and cut chunks by it.
+    """
+
+    vectorstore: Any
+    k: int = 5
+    filter: Optional[dict] = None     # metadata filter, e.g. {"domain": "rti"}
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self._with_scores(self.vectorstore.similarity_search_with_score(query, k=self.k, **self._kwargs()))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self._with_scores(
+            await self.vectorstore.asimilarity_search_with_score(query, k=self.k, **self._kwargs())
+        )
+
+    def _kwargs(self):
+        return {"filter": self.filter} if self.filter else {}
+
+    @staticmethod
+    def _with_scores(results):
+        docs = []
+        for doc, score in results:
+            doc.metadata["score"] = float(score)
+            docs.append(doc)
+        return docs
+
+
+class AdaptiveRetriever(BaseRetriever):
+    """
+    Over-fetches `fetch_k` scored chunks once, then keeps only the useful ones:
+    - score >= score_threshold and within relative_drop of the best score
+    - near-duplicates removed: cosine >= dedup_cosine between stored vectors
+      (local index), otherwise identical normalized text (no re-embedding)
+    - at least min_k, at most max_k chunks
+    The chosen k is counted in k_counts (and reported per turn in
+    CombinedLegalChatbot.last_metrics["retrieved_chunks"]).
+    """
+
+    vectorstore: Any
+    fetch_k: int = 20
+    min_k: int = 1
+    max_k: int = 5
+    score_threshold: float = 0.3
+    relative_drop: float = 0.25
+    dedup_cosine: float = 0.95
+    k_counts: dict = {}
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        results = self.vectorstore.similarity_search_with_score(query, k=self.fetch_k)
+        return self._select(self._candidates(results))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        results = await self.vectorstore.asimilarity_search_with_score(query, k=self.fetch_k)
+        return self._select(self._candidates(results))
+
+    def _candidates(self, results):
+        """Score cutoffs (keeping at least min_k), best first."""
+        docs = ScoredRetriever._with_scores(results)
+        if not docs:
+            return []
+        best = docs[0].metadata["score"]
+        cutoff = max(self.score_threshold, best * (1 - self.relative_drop))
+        passing = [d for d in docs if d.metadata["score"] >= cutoff]
+        if len(passing) < self.min_k:
+            passing = docs[:self.min_k]
+        # Duplicates are dropped next, so keep some spare candidates
+        return passing[:self.max_k * 2]
+
+    def _select(self, candidates):
+        if len(candidates) > 1 and hasattr(self.vectorstore, "get_vectors") and all(d.id for d in candidates):
+            vecs = self.vectorstore.get_vectors([d.id for d in candidates])
+            keep_rows = []
+            for row in range(len(candidates)):
+                if all(float(vecs[row] @ vecs[k]) < self.dedup_cosine for k in keep_rows):
+                    keep_rows.append(row)
+            kept = [candidates[r] for r in keep_rows]
+        else:
+            # Remote stores do not return vectors; drop exact text duplicates instead
+            kept, seen = [], set()
+            for doc in candidates:
+                key = " ".join(doc.page_content.lower().split())
+                if key not in seen:
+                    seen.add(key)
+                    kept.append(doc)
+        kept = kept[:self.max_k]
+
+        self.k_counts[len(kept)] = self.k_counts.get(len(kept), 0) + 1
+        return kept
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense retriever + local BM25 index, fused with reciprocal-rank fusion."""
+
+    dense: BaseRetriever
+    lexical: Any              # src.bm25.BM25Index
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        dense = self.dense.invoke(query)
+        lexical = [doc for doc, _ in self.lexical.search(query, self.fetch_k)]
+        return reciprocal_rank_fusion([dense, lexical], self.k, self.rrf_k)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        dense = await self.dense.ainvoke(query)
+        lexical = [doc for doc, _ in self.lexical.search(query, self.fetch_k)]
+        return reciprocal_rank_fusion([dense, lexical], self.k, self.rrf_k)
+
+
+# ---------------------------------------------------------
+# Domain partitions: search only the parts of the corpus a query is about
+# ---------------------------------------------------------
+_PARTITION_POOL = None
+
+
+def _get_partition_pool():
+    global _PARTITION_POOL
+    if _PARTITION_POOL is None:
+        _PARTITION_POOL = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PARTITION_WORKERS", str(len(DOMAINS)))),
+            thread_name_prefix="partition"
+        )
+    return _PARTITION_POOL
+
+
+def merge_by_score(result_lists, k: int):
+    """Best `k` Documents of several scored result lists (deduplicated by id/text)."""
+    best = {}
+    for results in result_lists:
+        for doc in results:
+            key = doc.id or doc.page_content
+            if key not in best or doc.metadata["score"] > best[key].metadata["score"]:
+                best[key] = doc
+    return sorted(best.values(), key=lambda d: d.metadata["score"], reverse=True)[:k]
+
+
+class PartitionedRetriever(BaseRetriever):
+    """
+    One scored retriever per domain partition. invoke(query, domains=(...))
+    searches the given partitions in parallel and merges them by score;
+    without domains every partition is searched (or `everything`, a single
+    retriever over the whole corpus, when the backend has one).
+    """
+
+    partitions: Dict[str, BaseRetriever]
+    everything: Optional[BaseRetriever] = None
+    k: int = 5
+    searches: dict = {}
+
+    def _targets(self, domains):
+        names = [d for d in (domains or ()) if d in self.partitions]
+        for name in names or ["*"]:
+            self.searches[name] = self.searches.get(name, 0) + 1
+        if names:
+            return [self.partitions[d] for d in names]
+        if self.everything is not None:
+            return [self.everything]
+        return list(self.partitions.values())
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, domains=None) -> List[Document]:
+        targets = self._targets(domains)
+        if len(targets) == 1:
+            return targets[0].invoke(query)
+        results = _get_partition_pool().map(lambda r: r.invoke(query), targets)
+        return merge_by_score(results, self.k)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None, domains=None) -> List[Document]:
+        targets = self._targets(domains)
+        results = await asyncio.gather(*(r.ainvoke(query) for r in targets))
+        return merge_by_score(results, self.k)
+
+
+def build_partitioned_retriever(top_k: int = 5, embeddings=None, backend: str = None):
+    """
+    - pinecone: one namespace per domain (ingest with --namespaces); the
+      default namespace holds the whole corpus for queries without a cue
+    - local: one index, partitions selected by the metadata["domain"] filter
+    """
+    embeddings = embeddings or load_embedding_model()
+    backend = (backend or os.getenv("VECTOR_BACKEND", "pinecone")).lower()
+
+    if backend == "local":
+        vectorstore = build_vectorstore(embeddings, backend)
+        partitions = {
+            d: ScoredRetriever(vectorstore=vectorstore, k=top_k, filter={"domain": d}) for d in DOMAINS
+        }
+        everything = ScoredRetriever(vectorstore=vectorstore, k=top_k)
+    else:
+        index = init_pinecone()
+        partitions = {
+            d: ScoredRetriever(vectorstore=build_vectorstore(embeddings, backend, namespace=d, index=index), k=top_k)
+            for d in DOMAINS
+        }
+        everything = ScoredRetriever(vectorstore=build_vectorstore(embeddings, backend, index=index), k=top_k)
+
+    print(f"🔎 Partitioned retriever initialized ({', '.join(DOMAINS)}).")
+    return PartitionedRetriever(partitions=partitions, everything=everything, k=top_k)
+
+
+def build_retriever(top_k: int = 5, embeddings=None):
+    """
+    Search retriever (see build_search_retriever) behind the persistent
+    retrieval cache (src/retrieval_cache.py) unless RETRIEVAL_CACHE=0.
+    """
+    retriever = build_search_retriever(top_k, embeddings)
+    if os.getenv("RETRIEVAL_CACHE", "1") == "0":
+        return retriever
+
+    from src.retrieval_cache import RetrievalCache, CachedRetriever, IndexVersion
+
+    version = IndexVersion()
+    if not version.available:
+        print(f"⚠️ No index version source ({version.path}); persistent retrieval cache disabled.")
+        return retriever
+
+    cache = RetrievalCache()
+    print(f"💾 Persistent retrieval cache: {cache.path} ({cache.stats()['size']} entries)")
+    return CachedRetriever(
+        retriever=retriever,
+        cache=cache,
+        version=version,
+        k=top_k,
+        partitioned=isinstance(retriever, PartitionedRetriever),
     )
 
-    print("🔎 Retriever initialized using langchain-pinecone.")
+
+def build_search_retriever(top_k: int = 5, embeddings=None):
+    """
+    Creates a LangChain retriever using:
+    - local embeddings (pass `embeddings` to reuse an already-loaded model)
+    - Pinecone or local vector index (VECTOR_BACKEND)
+    - cosine similarity search
+    - optionally fused with BM25 (RETRIEVAL_MODE=hybrid)
+    - or adaptive top-k with score cutoffs + dedup (RETRIEVAL_MODE=adaptive)
+    - or split into domain partitions (RETRIEVAL_PARTITIONS=1, dense only)
+    """
+
+    if os.getenv("RETRIEVAL_PARTITIONS", "0") == "1":
+        return build_partitioned_retriever(top_k, embeddings)
+
+    vectorstore = build_vectorstore(embeddings)
+    mode = os.getenv("RETRIEVAL_MODE", "dense").lower()
+
+    if mode == "adaptive":
+        print("🔎 Adaptive retriever initialized (over-fetch, score cutoff, dedup).")
+        return AdaptiveRetriever(
+            vectorstore=vectorstore,
+            fetch_k=int(os.getenv("ADAPTIVE_FETCH_K", "20")),
+            min_k=int(os.getenv("ADAPTIVE_MIN_K", "1")),
+            max_k=int(os.getenv("ADAPTIVE_MAX_K", str(top_k))),
+            score_threshold=float(os.getenv("ADAPTIVE_SCORE_THRESHOLD", "0.3")),
+            relative_drop=float(os.getenv("ADAPTIVE_RELATIVE_DROP", "0.25")),
+            dedup_cosine=float(os.getenv("ADAPTIVE_DEDUP_COSINE", "0.95")),
+        )
+
+    if mode == "hybrid":
+        from src.bm25 import BM25Index
+
+        lexical = BM25Index()
+        if len(lexical):
+            fetch_k = int(os.getenv("HYBRID_FETCH_K", str(top_k * 4)))
+            print("🔎 Hybrid retriever initialized (dense + BM25, RRF).")
+            return HybridRetriever(
+                dense=ScoredRetriever(vectorstore=vectorstore, k=fetch_k),
+                lexical=lexical,
+                k=top_k,
+                fetch_k=fetch_k,
+            )
+        print("⚠️ RETRIEVAL_MODE=hybrid but the BM25 index is empty; using dense only.")
+
+    retriever = ScoredRetriever(vectorstore=vectorstore, k=top_k)
+
+    print(f"🔎 Retriever initialized using {type(vectorstore).__name__}.")
     return retriever
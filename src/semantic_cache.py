@@ -0,0 +1,197 @@
+# src/semantic_cache.py
+"""
+Semantic answer cache for non-personal legal questions.
+
+Questions are keyed on their MiniLM query embedding: a new question whose
+cosine similarity to a cached one is above `threshold` reuses the cached answer
+instead of paying for a Pinecone query and a full llama2 generation.
+
+- fixed-size float32 matrix of unit vectors (one row per entry)
+- LRU eviction when full + TTL expiry
+- optional persistence to a .npz file
+- hit / miss counters
+"""
+
+import asyncio
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticCache:
+
+    def __init__(
+        self,
+        embeddings,
+        threshold: float = None,
+        max_entries: int = None,
+        ttl: float = None,
+        path: str = None,
+        save_every: int = 20,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+        self.ttl = ttl or float(os.getenv("SEMANTIC_CACHE_TTL", str(7 * 24 * 3600)))
+        self.path = path or os.getenv("SEMANTIC_CACHE_PATH")
+        self.save_every = save_every
+
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors = None               # (max_entries, dim) float32, allocated lazily
+        self._valid = np.zeros(self.max_entries, dtype=bool)
+        self._entries = [None] * self.max_entries   # slot → {"query", "answer", "created"}
+        self._lru = OrderedDict()          # slot → None, least recently used first
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+        if self.path and os.path.exists(self.path):
+            self.load()
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def lookup(self, query: str):
+        """Return the cached answer for a semantically close query, or None."""
+        return self.lookup_vector(self.embeddings.embed_query(query))
+
+    async def alookup(self, query: str):
+        return self.lookup_vector(await self.embeddings.aembed_query(query))
+
+    def put(self, query: str, answer: str):
+        self.put_vector(self.embeddings.embed_query(query), query, answer)
+
+    async def aput(self, query: str, answer: str):
+        """Async variant of put: the periodic save runs in a worker thread."""
+        if self._store(await self.embeddings.aembed_query(query), query, answer):
+            await asyncio.to_thread(self.save)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._lru),
+            "capacity": self.max_entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._valid[:] = False
+            self._entries = [None] * self.max_entries
+            self._lru.clear()
+
+    # ---------------------------------------------------------
+    # Vector-level operations
+    # ---------------------------------------------------------
+    def lookup_vector(self, vector):
+        vec = self._normalize(vector)
+
+        with self._lock:
+            if self._vectors is None or not self._lru:
+                self.misses += 1
+                return None
+
+            sims = self._vectors @ vec
+            sims[~self._valid] = -1.0
+            slot = int(np.argmax(sims))
+
+            if sims[slot] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry = self._entries[slot]
+            if time.time() - entry["created"] > self.ttl:
+                self._free(slot)
+                self.misses += 1
+                return None
+
+            self._lru.move_to_end(slot)
+            self.hits += 1
+            return entry["answer"]
+
+    def put_vector(self, vector, query: str, answer: str):
+        if self._store(vector, query, answer):
+            self.save()
+
+    def _store(self, vector, query, answer):
+        """Insert an entry; True when enough entries are unsaved to persist."""
+        entry = {"query": query, "answer": answer, "created": time.time()}
+
+        with self._lock:
+            self._insert(self._normalize(vector), entry)
+            self._unsaved += 1
+            return bool(self.path) and self._unsaved >= self.save_every
+
+    # ---------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path or self._vectors is None:
+            return
+
+        with self._lock:
+            slots = list(self._lru)   # LRU order is preserved on load
+            vectors = self._vectors[slots].copy()
+            entries = [self._entries[s] for s in slots]
+            self._unsaved = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, vectors=vectors, entries=np.array(json.dumps(entries)))
+        os.replace(tmp, path)
+
+    def load(self, path: str = None):
+        path = path or self.path
+        data = np.load(path)
+        vectors = data["vectors"].astype(np.float32)
+        entries = json.loads(str(data["entries"]))
+
+        self.clear()
+        now = time.time()
+        with self._lock:
+            for vec, entry in zip(vectors, entries):
+                if now - entry["created"] <= self.ttl:
+                    self._insert(self._normalize(vec), entry)
+            self._unsaved = 0
+        print(f"💾 Semantic cache loaded {len(self._lru)} entries from {path}")
+
+    # ---------------------------------------------------------
+    # Helpers (caller holds self._lock)
+    # ---------------------------------------------------------
+    def _insert(self, vec, entry):
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+
+        slot = self._free_slot()
+        self._vectors[slot] = vec
+        self._valid[slot] = True
+        self._entries[slot] = entry
+        self._lru[slot] = None
+
+    def _free_slot(self):
+        free = np.flatnonzero(~self._valid)
+        if len(free):
+            return int(free[0])
+
+        slot, _ = self._lru.popitem(last=False)
+        return slot
+
+    def _free(self, slot):
+        self._valid[slot] = False
+        self._entries[slot] = None
+        self._lru.pop(slot, None)
+
+    @staticmethod
+    def _normalize(vector):
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
@@ -0,0 +1,130 @@
+# src/session_manager.py
+"""
+Per-user chat sessions for the API server.
+
+Every session owns a lightweight CombinedLegalChatbot (its own MemoryChatbot)
+forked from one base chatbot, so the LLM client, retriever and embedding model
+are loaded once and shared. Sessions are evicted LRU-first when the registry is
+full and after they have been idle for too long.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class ChatSession:
+    """One user's chatbot plus the lock that serializes their turns."""
+
+    def __init__(self, session_id, bot):
+        self.session_id = session_id
+        self.bot = bot
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.users = 0          # requests holding the session (see SessionManager.use)
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    @property
+    def busy(self):
+        return self.users > 0 or self.lock.locked()
+
+
+class SessionManager:
+    """
+    Registry of ChatSession objects keyed by session/user id.
+
+    - max_sessions: cap on live sessions (least recently used are evicted)
+    - idle_ttl: seconds after which an unused session is dropped
+    Sessions held by a request (use()) or in the middle of a turn are never
+    evicted.
+    """
+
+    def __init__(self, base_bot, max_sessions=None, idle_ttl=None):
+        self.base_bot = base_bot
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX", "1000"))
+        self.idle_ttl = idle_ttl or float(os.getenv("SESSION_IDLE_TTL", "3600"))
+
+        self._sessions = OrderedDict()
+        # Guards the registry only; turns are serialized by ChatSession.lock
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    def get(self, session_id: str) -> ChatSession:
+        """
+        Return the session for this id, creating it if needed. The session is
+        not pinned: requests should use `with sessions.use(id)` so it cannot be
+        evicted between the lookup and taking its lock.
+        """
+        with self._lock:
+            return self._get(session_id)
+
+    @contextmanager
+    def use(self, session_id: str):
+        """Pin the session for the duration of a request."""
+        with self._lock:
+            session = self._get(session_id)
+            session.users += 1
+        try:
+            yield session
+        finally:
+            with self._lock:
+                session.users -= 1
+                session.touch()
+                # Keep the LRU order in step with last_used (_evict_idle relies on it)
+                if self._sessions.get(session.session_id) is session:
+                    self._sessions.move_to_end(session.session_id)
+
+    def _get(self, session_id):
+        # Caller holds self._lock
+        self._evict_idle()
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = ChatSession(session_id, self.base_bot.fork())
+            self._sessions[session_id] = session
+            self._evict_overflow()
+        else:
+            self._sessions.move_to_end(session_id)
+
+        session.touch()
+        return session
+
+    def drop(self, session_id: str) -> bool:
+        """Forget a session (e.g. on logout / reset)."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    # ---------------------------------------------------------
+    # Eviction (caller holds self._lock)
+    # ---------------------------------------------------------
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        for sid, session in list(self._sessions.items()):
+            # OrderedDict is in LRU order: stop at the first fresh session
+            if session.last_used > cutoff:
+                break
+            if not session.busy:
+                del self._sessions[sid]
+
+    def _evict_overflow(self):
+        overflow = len(self._sessions) - self.max_sessions
+        if overflow <= 0:
+            return
+
+        for sid, session in list(self._sessions.items()):
+            if overflow <= 0:
+                break
+            if not session.busy:
+                del self._sessions[sid]
+                overflow -= 1
@@ -0,0 +1,74 @@
+# src/single_flight.py
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When many users ask the same question at once (a legal-aid camp opening),
+only the first caller (the leader) runs the retrieval / LLM call; every
+identical call that arrives while it is in flight waits for and shares its
+result. Nothing is cached once the call completes — that is the job of the
+semantic answer cache.
+
+Threads (do) and coroutines (ado) can coalesce on the same key. Results are
+shared objects: callers must not mutate them.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._calls = {}          # key → concurrent.futures.Future of the in-flight call
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def _join(self, key):
+        """Returns (future, is_leader)."""
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _complete(self, key, future, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    # ---------------------------------------------------------
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers with the same key."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._complete(key, future, error=e)
+            raise
+        self._complete(key, future, result)
+        return result
+
+    async def ado(self, key, coro_fn):
+        """Async do(): coro_fn() is awaited once for all concurrent callers."""
+        future, leader = self._join(key)
+        if leader:
+            # A task, so a cancelled leader does not cancel the call its followers wait on
+            task = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda t: self._complete(
+                key, future,
+                error=asyncio.CancelledError() if t.cancelled() else t.exception(),
+                result=None if t.cancelled() or t.exception() else t.result()
+            ))
+            return await asyncio.shield(task)
+
+        return await asyncio.shield(asyncio.wrap_future(future))
@@ -0,0 +1,71 @@
+# tests_src/bench_context_compression.py
+# Full retrieved chunks vs. extractive context compression (src/context_compressor.py).
+# For each legal question: prompt tokens, pre-LLM time, total time and a
+# simple answer-quality score (share of expected key terms in the answer).
+# Needs the vector index, MiniLM and Ollama. Answer cache and FAQ are
+# disabled so every question reaches the LLM, and the retrieval cache so the
+# second run does not get retrieval hits the first one paid for.
+
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+os.environ["SEMANTIC_CACHE"] = "0"
+os.environ["FAQ_INDEX"] = "0"
+os.environ["SINGLE_FLIGHT"] = "0"
+os.environ["RETRIEVAL_CACHE"] = "0"
+
+from src.combined_chain import CombinedLegalChatbot
+from src.context_compressor import ContextCompressor
+
+# question → key terms a correct answer should mention
+CASES = {
+    "What is the punishment for theft?": ["imprisonment", "three years", "fine"],
+    "How do I file an RTI application?": ["public information officer", "fee", "30 days"],
+    "Can the police arrest someone without a warrant?": ["cognizable", "warrant", "magistrate"],
+    "What is anticipatory bail?": ["arrest", "bail", "court"],
+    "What rights does an arrested person have?": ["informed", "lawyer", "24 hours"],
+    "What is the limitation period for a consumer complaint?": ["two years", "consumer"],
+}
+
+
+def quality(answer, terms):
+    answer = answer.lower()
+    return sum(term in answer for term in terms) / len(terms)
+
+
+def run(bot, label):
+    rows = []
+    for question, terms in CASES.items():
+        session = bot.fork()
+        session.compressor = bot.compressor     # fork() would re-create a disabled one
+        start = time.perf_counter()
+        answer = session.generate(question)
+        m = session.last_metrics
+        rows.append((m.get("prompt_tokens", 0), m["stages"].get("pre_llm", 0.0),
+                     time.perf_counter() - start, quality(answer, terms)))
+        print(f"  [{label}] {question[:45]:<45} tokens={rows[-1][0]:>5} "
+              f"total={rows[-1][2]:6.2f}s quality={rows[-1][3]:.2f}")
+
+    n = len(rows)
+    return [sum(r[i] for r in rows) / n for i in range(4)]
+
+
+base = CombinedLegalChatbot()
+base.warm_up()
+
+full = base.fork()
+full.compressor = None
+compressed = base.fork()
+compressed.compressor = base.compressor or ContextCompressor(base.embeddings)
+
+results = {"full chunks": run(full, "full"), "compressed": run(compressed, "compressed")}
+
+print(f"\n{'mode':<12} {'prompt tok':>10} {'pre-LLM s':>10} {'total s':>8} {'quality':>8}")
+for mode, (tokens, pre_llm, total, score) in results.items():
+    print(f"{mode:<12} {tokens:>10.0f} {pre_llm:>10.3f} {total:>8.2f} {score:>8.2f}")
+
+print("\nCompressor stats:", compressed.compressor.stats)
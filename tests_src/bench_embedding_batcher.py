@@ -0,0 +1,44 @@
+# tests_src/bench_embedding_batcher.py
+# Compares embeddings/sec of direct embed_query calls vs. the EmbeddingBatcher
+# at 1, 8 and 32 concurrent callers. Query cache is disabled so every call
+# really hits the model.
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from src.embeddings import LocalSentenceTransformerEmbeddings, MODEL_PATH
+from src.embedding_batcher import EmbeddingBatcher
+
+QUERIES_PER_CALLER = 64
+
+base = LocalSentenceTransformerEmbeddings(MODEL_PATH, query_cache_size=0)
+batcher = EmbeddingBatcher(base)
+
+# warm up the model
+base.embed_query("warm up")
+
+
+def run(embed, callers):
+    def worker(cid):
+        for i in range(QUERIES_PER_CALLER):
+            embed(f"caller {cid} question {i}: how do I file an FIR for theft?")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(worker, range(callers)))
+    elapsed = time.perf_counter() - start
+    return callers * QUERIES_PER_CALLER / elapsed
+
+
+print(f"{'callers':>8} {'direct/s':>10} {'batched/s':>10} {'speedup':>8}")
+for callers in (1, 8, 32):
+    direct = run(base.embed_query, callers)
+    batched = run(batcher.embed_query, callers)
+    print(f"{callers:>8} {direct:>10.1f} {batched:>10.1f} {batched / direct:>7.2f}x")
+
+print("\nBatcher stats:", batcher.stats())
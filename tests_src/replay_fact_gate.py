@@ -0,0 +1,84 @@
+# tests_src/replay_fact_gate.py
+# Replays a conversation log through MemoryChatbot and reports how many
+# extraction LLM calls the FactGate and batching save. The LLM is replaced by
+# a counter, so this runs without Ollama (lexical gate only, no MiniLM).
+
+import os
+import sys
+import json
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from src.memory_chain import MemoryChatbot, FactGate
+from src.fact_worker import FactExtractionWorker
+
+CONVERSATION = [
+    "Hello",
+    "My name is Ramesh",
+    "I live in Mysuru",
+    "Who am I?",
+    "I am a daily wage worker",
+    "What do I do for a living?",
+    "I have a dispute regarding tenancy rights.",
+    "I want to know the difference between a plaint and a petition.",
+    "I need help with a boundary encroachment dispute.",
+    "What is a plaint?",
+    "How to file an FIR?",
+    "What is the procedure under Section 154 CrPC?",
+    "My landlord is Mr. Shetty and he wants me out in a week",
+    "Can he evict me without notice?",
+    "My father's name is Krishnappa",
+    "What is the RTI fee in Karnataka?",
+    "Is dowry harassment a crime?",
+    "My employer has not paid me for two months",
+    "What can I do about unpaid wages?",
+    "Thank you",
+]
+
+
+class CountingLLM:
+    """Stands in for ChatOllama: counts calls, extracts nothing."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def bind(self, **kwargs):
+        return self
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return type("Msg", (), {"content": json.dumps({"facts": []})})()
+
+
+def replay(gate, worker=None):
+    llm = CountingLLM()
+    memory = MemoryChatbot(llm=llm, fact_worker=worker, fact_gate=gate)
+    for message in CONVERSATION:
+        memory.add_user_message(message)
+    memory.wait_for_pending_facts()
+    return llm.calls
+
+
+class OpenGate(FactGate):
+    """The old behaviour: every regex miss goes to the LLM."""
+
+    def may_contain_fact(self, text):
+        return True
+
+
+if __name__ == "__main__":
+    before = replay(OpenGate())
+    gate = FactGate()
+    after = replay(gate)
+
+    # Batching: all gated messages of the session queued before a worker frees up
+    worker = FactExtractionWorker(workers=1, max_batch=8)
+    worker._pool.submit(lambda: __import__("time").sleep(0.2))   # keep the worker busy
+    batched = replay(FactGate(), worker)
+
+    print(f"messages replayed           : {len(CONVERSATION)}")
+    print(f"extraction LLM calls before : {before}")
+    print(f"with FactGate               : {after} ({1 - after / before:.0%} fewer)")
+    print(f"with FactGate + batching    : {batched}")
+    print(f"gate stats                  : {gate.stats}")
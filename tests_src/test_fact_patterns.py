@@ -0,0 +1,37 @@
+# tests_src/test_fact_patterns.py
+# Regex fact extraction in src/memory_chain.py (no LLM needed): when one
+# sentence matches several fields, the field listed first in
+# MemoryChatbot.regex_patterns wins, wherever it appears in the sentence.
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from src.memory_chain import MemoryChatbot
+
+
+def extract(text):
+    bot = MemoryChatbot(llm=object())
+    bot._extract_facts_regex(text, bot._next_version())
+    return bot.memory_store
+
+
+def test_single_facts():
+    assert extract("My name is Ravi") == {"name": "ravi"}
+    assert extract("I am 34 years old") == {"age": "34"}
+    assert extract("I live in Pune") == {"location": "pune"}
+
+
+def test_multi_fact_sentence_uses_field_priority():
+    # location appears first in the text, but name has priority
+    assert extract("I live in Pune, my name is Ravi") == {"name": "ravi"}
+    # "i am a" (occupation) is leftmost; age is listed before occupation
+    assert extract("I am a driver and I am 34 years old") == {"age": "34"}
+
+
+if __name__ == "__main__":
+    test_single_facts()
+    test_multi_fact_sentence_uses_field_priority()
+    print("✅ fact pattern checks passed")
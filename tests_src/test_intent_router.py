@@ -0,0 +1,89 @@
+# tests_src/test_intent_router.py
+# Labelled accuracy check + microbenchmark for src/intent_router.py
+# (keyword pass only; the embedding fallback needs the MiniLM model).
+
+import os
+import sys
+import re
+import json
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from src.intent_router import IntentRouter
+
+CASES_PATH = os.path.join(os.path.dirname(__file__), "intent_cases.json")
+
+# The per-call regex loop that combined_chain used before the router
+OLD_LEGAL_PATTERNS = [
+    r"dispute", r"rights", r"law", r"illegal", r"how to file",
+    r"fir", r"rti", r"tenant", r"harassment", r"police",
+]
+
+
+def old_is_legal_query(q):
+    q = q.lower()
+    return any(re.search(p, q) for p in OLD_LEGAL_PATTERNS)
+
+
+def load_cases():
+    with open(CASES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_labelled_accuracy():
+    router = IntentRouter()
+    cases = load_cases()
+    wrong = []
+    for case in cases:
+        got = set(router.route(case["text"]).intents)
+        if got != set(case["intents"]):
+            wrong.append((case["text"], sorted(got), case["intents"]))
+
+    accuracy = 1 - len(wrong) / len(cases)
+    for text, got, expected in wrong:
+        print(f"  ✗ {text!r}: got {got}, expected {expected}")
+    print(f"Exact intent-set accuracy: {accuracy:.1%} on {len(cases)} cases")
+    assert not wrong
+
+
+def test_fir_does_not_match_first():
+    router = IntentRouter()
+    assert not router.route("The first hearing is next week").is_legal
+    assert router.route("How to file an FIR?").is_legal
+
+
+def test_document_cue_keeps_legal_cue():
+    router = IntentRouter()
+    route = router.route("Help me write an RTI application")
+    assert route.intents == {"document", "legal"}
+    assert router.route("How do I file an FIR?").intents == {"legal"}
+
+
+def test_query_domains():
+    router = IntentRouter()
+    assert router.route("My landlord wants to evict me").domains == ("tenancy",)
+    assert router.route("How do I file an RTI?").domains == ("rti",)
+    assert set(router.route("Police refused my FIR, can I file an RTI?").domains) == {"criminal", "rti"}
+    # No domain cue → search every partition
+    assert router.route("What are my legal rights?").domains == ()
+
+
+def benchmark(number=20000):
+    router = IntentRouter()
+    texts = [c["text"] for c in load_cases()]
+
+    old = timeit.timeit(lambda: [old_is_legal_query(t) for t in texts], number=number // len(texts))
+    new = timeit.timeit(lambda: [router.route(t) for t in texts], number=number // len(texts))
+    per_old = old / number * 1e6
+    per_new = new / number * 1e6
+    print(f"old regex loop (legal only): {per_old:.2f} µs/query")
+    print(f"intent router (all intents): {per_new:.2f} µs/query")
+
+
+if __name__ == "__main__":
+    test_labelled_accuracy()
+    test_fir_does_not_match_first()
+    test_query_domains()
+    benchmark()
@@ -0,0 +1,80 @@
+# tests_src/test_personal_responder.py
+# Lookup matching + microbenchmark for src/personal_responder.py
+# (no LLM needed: answers come straight from a MemoryChatbot's regex facts).
+
+import os
+import sys
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from src.personal_responder import PersonalFactResponder
+
+
+class FakeMemory:
+    def __init__(self, facts):
+        self.memory_store = facts
+
+    def get_fact(self, key):
+        return self.memory_store.get(key)
+
+
+LOOKUPS = {
+    "What is my name?": "name",
+    "who am i": "name",
+    "Hey, can you tell me my name please": "name",
+    "Do you remember my name?": "name",
+    "Where do I live?": "location",
+    "how old am I?": "age",
+    "What's my phone number?": "phone",
+    "What is my father's name?": "father_name",
+}
+
+NOT_LOOKUPS = [
+    "What is my name and can I file an RTI?",
+    "My name is Ravi",
+    "What are my rights as a tenant?",
+    "Who am I supposed to complain to about the police?",
+    "Where do I live if my landlord evicts me?",
+]
+
+
+def test_lookups():
+    responder = PersonalFactResponder()
+    for text, key in LOOKUPS.items():
+        assert responder.match(text) == key, text
+
+
+def test_compound_and_statements_fall_back():
+    responder = PersonalFactResponder()
+    for text in NOT_LOOKUPS:
+        assert responder.match(text) is None, text
+
+
+def test_answers_from_memory():
+    responder = PersonalFactResponder()
+    memory = FakeMemory({"name": "Ravi Kumar", "age": "34"})
+    assert responder.answer("name", memory) == "Your name is Ravi Kumar."
+    assert responder.answer("age", memory) == "You are 34 years old."
+    # Missing fact → None, the chatbot falls back to the LLM
+    assert responder.answer("location", memory) is None
+
+
+def benchmark(number=50000):
+    responder = PersonalFactResponder()
+    memory = FakeMemory({"name": "Ravi Kumar"})
+
+    def answer():
+        return responder.answer(responder.match("What is my name?"), memory)
+
+    seconds = timeit.timeit(answer, number=number)
+    print(f"Direct personal answer: {seconds / number * 1e6:.2f} µs/query")
+
+
+if __name__ == "__main__":
+    test_lookups()
+    test_compound_and_statements_fall_back()
+    test_answers_from_memory()
+    print("✅ personal responder checks passed")
+    benchmark()
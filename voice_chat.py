@@ -78,7 +78,8 @@ from livekit.plugins.openai import STT, TTS
 from langchain_core.runnables import RunnableLambda
 
 # Your custom LangChain RAG brain
-from src.combined_chain import CombinedLegalChatbot
+from src.combined_chain import CombinedLegalChatbot, load_llm
+from src.llm_client import PRIORITY_VOICE
 
 # -----------------------------------------------------------
 # Load environment variables
@@ -101,7 +102,7 @@ if not OPENAI_API_KEY:
 # -----------------------------------------------------------
 print("🧠 Loading RAG-based CombinedLegalChatbot…")
 rag_bot = CombinedLegalChatbot(
-    model_name=os.getenv("LLAMA_MODEL", "llama2")
+    llm=load_llm(os.getenv("LLAMA_MODEL", "llama2"), priority=PRIORITY_VOICE)
 )
 
 rag_runnable = RunnableLambda(